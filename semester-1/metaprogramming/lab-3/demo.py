@@ -41,8 +41,8 @@ def sample_class_demo(py2sql):
 
 
 def hierarchy_demo(py2sql):
-    py2sql.save_hierarchy(date)
-    py2sql.delete_hierarchy(date)
+    print('DDL statements issued on save:', py2sql.save_hierarchy(date))
+    print('DDL statements issued on delete:', py2sql.delete_hierarchy(date))
 
 
 def db_info_demo(py2sql, table_name):
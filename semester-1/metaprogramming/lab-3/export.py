@@ -0,0 +1,334 @@
+"""
+Module implements streaming export of tables created by Py2SQL.
+
+Rows are fetched in fixed-size chunks, so memory consumption does not depend on table size.
+Supported formats are CSV, JSON Lines and NumPy structured arrays (.npy or .npz).
+"""
+
+import csv
+import json
+import os
+import tempfile
+import zipfile
+from array import array
+
+from py2sql import Py2SQL
+from util import *
+
+
+class Py2SQLExporter:
+    def __init__(self, py2sql: Py2SQL, chunk_size=10_000):
+        """
+        :param py2sql: Py2SQL instance connected to the database to export from
+        :param chunk_size: number of rows fetched from the database at once
+        """
+        self.py2sql = py2sql
+        self.chunk_size = chunk_size
+
+    def get_columns(self, cls, with_bases=False) -> list:
+        """
+        Retrieve names of exported columns for given class
+
+        Columns of base classes tables are prefixed with base class table name and a dot
+
+        :param cls: class to get exported columns for
+        :param with_bases: True to include columns of base classes tables
+        :rtype: list
+        :return: list of column names
+        """
+        return [name for name, _ in self.__get_select_columns(Py2SQL.get_class_table_name(cls), with_bases)]
+
+    def iter_chunks(self, cls, with_bases=False, objects_only=True, decode=True):
+        """
+        Stream rows of the table representing given class
+
+        :param cls: class to export table of
+        :param with_bases: True to include columns of base classes tables by following BASE_REF columns
+        :param objects_only: True to skip row holding class attributes values
+        :param decode: True to recreate python values from their SQLite representation
+        :return: generator of lists of row tuples, each list contains at most chunk_size rows
+        """
+        cursor = self.py2sql.connection.cursor()
+        try:
+            cursor.execute(self.__get_select_query(Py2SQL.get_class_table_name(cls), with_bases, objects_only))
+            while True:
+                rows = cursor.fetchmany(self.chunk_size)
+                if not rows:
+                    break
+                if decode:
+                    rows = [tuple(map(from_sqlite_repr, r)) for r in rows]
+                yield rows
+        finally:
+            cursor.close()
+
+    def to_csv(self, cls, path, with_bases=False, objects_only=True) -> int:
+        """
+        Export table of given class to CSV file
+
+        :param cls: class to export table of
+        :param path: path to the CSV file
+        :param with_bases: True to include columns of base classes tables
+        :param objects_only: True to skip row holding class attributes values
+        :rtype: int
+        :return: number of rows exported
+        """
+        count = 0
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(self.get_columns(cls, with_bases))
+            for rows in self.iter_chunks(cls, with_bases, objects_only):
+                writer.writerows(rows)
+                count += len(rows)
+        return count
+
+    def to_jsonl(self, cls, path, with_bases=False, objects_only=True) -> int:
+        """
+        Export table of given class to JSON Lines file, one JSON object per row
+
+        :param cls: class to export table of
+        :param path: path to the JSON Lines file
+        :param with_bases: True to include columns of base classes tables
+        :param objects_only: True to skip row holding class attributes values
+        :rtype: int
+        :return: number of rows exported
+        """
+        columns = self.get_columns(cls, with_bases)
+        count = 0
+        with open(path, 'w', encoding='utf-8') as f:
+            for rows in self.iter_chunks(cls, with_bases, objects_only):
+                f.writelines(json.dumps(dict(zip(columns, r)), default=Py2SQLExporter.__to_json) + '\n'
+                             for r in rows)
+                count += len(rows)
+        return count
+
+    def to_numpy(self, cls, path, with_bases=False, objects_only=True) -> int:
+        """
+        Export table of given class to NumPy structured array stored in .npy or .npz file
+
+        Array is written through memory-mapped .npy file chunk by chunk. Columns holding only integers are
+        stored as int64, columns holding only numbers as float64 (NULL becomes nan), others as unicode strings.
+        Columns holding an integer outside int64 are stored as unicode strings, so that no value is rounded.
+        For .npz path the array is stored under the table name key. Partially written file is removed on error.
+
+        :param cls: class to export table of
+        :param path: path to the .npy or .npz file
+        :param with_bases: True to include columns of base classes tables
+        :param objects_only: True to skip row holding class attributes values
+        :rtype: int
+        :return: number of rows exported
+        """
+        import numpy as np
+        from numpy.lib.format import open_memmap
+
+        table_name = Py2SQL.get_class_table_name(cls)
+        dtype, count = self.__get_numpy_dtype(table_name, with_bases, objects_only)
+
+        if path.endswith('.npz'):
+            fd, npy_path = tempfile.mkstemp(suffix='.npy', dir=os.path.dirname(os.path.abspath(path)))
+            os.close(fd)
+        else:
+            npy_path = path
+
+        data, created = None, False
+        try:
+            data = open_memmap(npy_path, mode='w+', dtype=np.dtype(dtype), shape=(count,))
+            created = True
+            start = 0
+            for rows in self.iter_chunks(cls, with_bases, objects_only):
+                rows = rows[:count - start]  # table could grow since it was counted
+                data[start:start + len(rows)] = [
+                    tuple(Py2SQLExporter.__to_numpy(v, t) for v, (_, t) in zip(r, dtype)) for r in rows
+                ]
+                start += len(rows)
+            data.flush()
+            del data
+
+            if npy_path != path:
+                with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+                    zf.write(npy_path, arcname=table_name + '.npy')
+        except Exception:
+            data = None  # memory map is closed before its file is removed
+            if npy_path == path and created:
+                os.remove(path)
+            raise
+        finally:
+            if npy_path != path:
+                os.remove(npy_path)
+
+        return start
+
+    def __get_select_columns(self, table_name, with_bases) -> list:
+        """
+        Retrieve list of columns to be selected for given table
+
+        :param table_name: name of the exported table
+        :param with_bases: True to include columns of base classes tables
+        :rtype: list
+        :return: list of two-element tuples: exported column name, SQL expression selecting it
+        """
+        columns = [(c, 't0."{}"'.format(c)) for c in self.__get_table_columns(table_name)]
+        if with_bases:
+            for alias, base_table, _, _ in self.__get_base_joins(table_name):
+                columns += [('{}.{}'.format(base_table, c), '{}."{}"'.format(alias, c))
+                            for c in self.__get_table_columns(base_table)
+                            if c not in (PY2SQL_COLUMN_ID_NAME, PY2SQL_OBJECT_PYTHON_ID_COLUMN_NAME)]
+        return columns
+
+    def __get_base_joins(self, table_name) -> list:
+        """
+        Retrieve base classes tables joined through BASE_REF columns, transitively and without duplicates
+
+        :param table_name: name of the exported table
+        :rtype: list
+        :return: list of four-element tuples: alias, base table name, referencing alias, referencing column
+        """
+        joins = []
+        aliases = {table_name: 't0'}
+        to_visit = [table_name]
+        while to_visit:
+            current = to_visit.pop(0)
+            for c in self.__get_table_columns(current):
+                if not c.startswith(PY2SQL_BASE_CLASS_REFERENCE_PREFIX + PY2SQL_SEPARATOR):
+                    continue
+                base_table = c[len(PY2SQL_BASE_CLASS_REFERENCE_PREFIX + PY2SQL_SEPARATOR):]
+                if base_table in aliases or not self.__get_table_columns(base_table):
+                    continue
+                aliases[base_table] = 't{}'.format(len(aliases))
+                joins.append((aliases[base_table], base_table, aliases[current], c))
+                to_visit.append(base_table)
+        return joins
+
+    def __get_select_query(self, table_name, with_bases, objects_only, aliased=False) -> str:
+        """
+        Build query selecting exported rows of given table
+
+        :param table_name: name of the exported table
+        :param with_bases: True to include columns of base classes tables
+        :param objects_only: True to skip row holding class attributes values
+        :param aliased: True to name selected columns c0, c1, ...
+        :rtype: str
+        :return: SELECT query
+        """
+        expressions = [expr for _, expr in self.__get_select_columns(table_name, with_bases)]
+        if aliased:
+            expressions = ['{} AS c{}'.format(expr, i) for i, expr in enumerate(expressions)]
+
+        query = 'SELECT {} FROM "{}" AS t0'.format(', '.join(expressions), table_name)
+        if with_bases:
+            for alias, base_table, ref_alias, ref_column in self.__get_base_joins(table_name):
+                query += ' LEFT JOIN "{}" AS {} ON {}."{}" = {}."{}"'.format(
+                    base_table, alias, alias, PY2SQL_COLUMN_ID_NAME, ref_alias, ref_column
+                )
+        if objects_only:
+            query += ' WHERE t0."{}" IS NOT NULL'.format(PY2SQL_OBJECT_PYTHON_ID_COLUMN_NAME)
+        return query + ' ORDER BY t0."{}"'.format(PY2SQL_COLUMN_ID_NAME)
+
+    def __get_table_columns(self, table_name) -> list:
+        """
+        Retrieve column names of given table
+
+        :param table_name: table name
+        :rtype: list
+        :return: column names, empty list if there is no such table
+        """
+        return [name for _, name, _ in self.py2sql.db_table_structure('"{}"'.format(table_name))]
+
+    def __get_numpy_dtype(self, table_name, with_bases, objects_only) -> tuple:
+        """
+        Compute NumPy structured dtype of exported rows in a single aggregate query
+
+        :param table_name: name of the exported table
+        :param with_bases: True to include columns of base classes tables
+        :param objects_only: True to skip row holding class attributes values
+        :rtype: tuple
+        :return: two-element tuple: list of (column name, dtype string) tuples, number of rows
+        """
+        columns = self.__get_select_columns(table_name, with_bases)
+        aggregates = []
+        for i in range(len(columns)):
+            c = 'c{}'.format(i)
+            # integers outside int64 are exported as strings, float64 would round them
+            not_int = "{0} IS NULL OR NOT (typeof({0}) = 'integer' OR {0} LIKE 'int(%' OR {0} LIKE 'bool(%') " \
+                      "OR py2sql_is_big_int({0})".format(c)
+            not_number = "{0} IS NOT NULL AND NOT (typeof({0}) IN ('integer', 'real') OR {0} LIKE 'int(%' " \
+                         "OR {0} LIKE 'float(%' OR {0} LIKE 'bool(%') OR py2sql_is_big_int({0})".format(c)
+            aggregates += ['total({})'.format(not_int), 'total({})'.format(not_number),
+                           'max(py2sql_length({}))'.format(c)]
+
+        query = 'SELECT count(*), {} FROM ({})'.format(
+            ', '.join(aggregates), self.__get_select_query(table_name, with_bases, objects_only, aliased=True)
+        )
+        self.py2sql.connection.create_function('py2sql_length', 1, Py2SQLExporter.__get_decompressed_length,
+                                               deterministic=True)
+        self.py2sql.connection.create_function('py2sql_is_big_int', 1, Py2SQLExporter.__is_big_int,
+                                               deterministic=True)
+        stats = self.py2sql.connection.execute(query).fetchone()
+
+        dtype = []
+        for i, (name, _) in enumerate(columns):
+            not_int, not_number, max_len = stats[1 + 3 * i: 4 + 3 * i]
+            if not not_int:
+                dtype.append((name, 'i8'))
+            elif not not_number:
+                dtype.append((name, 'f8'))
+            else:
+                dtype.append((name, 'U{}'.format(max(int(max_len or 0), 1))))
+        return dtype, stats[0]
+
+    @staticmethod
+    def __get_decompressed_length(value):
+        """
+        Compute length of a stored value as SQLite length() does, compressed values are decompressed first
+
+        :param value: value fetched from the database
+        :return: length or None for NULL
+        """
+        value = decompress_sqlite_repr(value)
+        if value is None:
+            return None
+        return len(value) if isinstance(value, (str, bytes)) else len(str(value))
+
+    @staticmethod
+    def __is_big_int(value) -> int:
+        """
+        Check if stored value represents an integer which does not fit int64
+
+        :param value: value fetched from the database
+        :rtype: int
+        :return: 1 if value is int(...) representation of an integer outside int64, 0 otherwise
+        """
+        if not isinstance(value, str) or not value.startswith('int(') or not value.endswith(')'):
+            return 0
+        try:
+            return int(not -2 ** 63 <= int(value[4:-1]) < 2 ** 63)
+        except ValueError:
+            return 0
+
+    @staticmethod
+    def __to_numpy(value, dtype):
+        """
+        Convert decoded value to be stored in NumPy structured array field of given dtype
+
+        :param value: decoded value
+        :param dtype: dtype string of the field
+        :return: converted value
+        """
+        if dtype == 'f8':
+            return float('nan') if value is None else float(value)
+        if dtype == 'i8':
+            return int(value)
+        if value is None:
+            return ''
+        return value if isinstance(value, str) else str(value)
+
+    @staticmethod
+    def __to_json(value):
+        """
+        Convert decoded value which is not JSON serializable
+
+        :param value: decoded value
+        :return: JSON serializable value
+        """
+        if isinstance(value, (set, frozenset, array)):
+            return list(value)
+        return str(value)
@@ -6,23 +6,60 @@ Trying to save the same object (update) with another aggregated object
 will rewrite old object!
 """
 
+import hashlib
 import os
 import sqlite3
 from array import array
+from itertools import chain, islice
 from inspect import *
 import builtins
 import sys
 import logging
+import threading
+import time
+import zlib
 
 from util import *
 from demo_classes import *
 
 
 class Py2SQL:
-    def __init__(self, logs_enabled=False, log_file=""):
+    def __init__(self, logs_enabled=False, log_file="", save_methods=True, change_log=False, compression=None,
+                 compression_threshold=1024, compressed_columns=()):
+        """
+        :param logs_enabled: True to enable, False to disable
+        :param log_file: absolute path with file name of file for logging to
+        :param save_methods: False to skip CLASS_METHOD and OBJECT_METHOD columns entirely
+        :param change_log: True to record every insert, update and delete of objects in the change log table
+        :param compression: 'zlib' or 'lzma' to compress large object attribute values, None to disable
+        :param compression_threshold: length of representation starting from which values are compressed
+        :param compressed_columns: attribute or column names which values are compressed regardless of size
+        """
+        if compression is not None and compression not in PY2SQL_COMPRESSION_HEADERS:
+            raise ValueError("'zlib', 'lzma' or None expected as compression. Got " + str(compression))
         self.filename = None
         self.connection = None
         self.cursor = None
+        self.save_methods = save_methods
+        self.change_log = change_log
+        self.compression = compression
+        self.compression_threshold = compression_threshold
+        self.compressed_columns = set(compressed_columns)
+        self.__source_cache = {}
+        self.__stored_source_hashes = set()
+        self.__batch_depth = 0
+        self.__ddl_count = 0
+        self.__table_columns = {}
+        self.__hydration_plans = {}
+        self.__disk_connection = None
+        self.__flush_thread = None
+        self.__flush_event = threading.Event()
+        self.__flush_lock = threading.Lock()
+        self.__flush_stopped = False
+        self.__flush_rows = 0
+        self.__flushed_changes = 0
+        self.__shard_filenames = []
+        self.__shard_by = None
 
     def __setup_logger(self, logs_enabled: bool, log_file: str):
         """
@@ -37,28 +74,308 @@ class Py2SQL:
         logger.addFilter(lambda r: bool(logs_enabled))
         return logger
 
-    def db_connect(self, db_filepath: str) -> None:
+    def db_connect(self, db_filepath: str, write_behind=False, flush_interval=5.0, flush_rows=1000, shards=None,
+                   shard_by='class') -> None:
         """
         Connect to the database in given path
 
+        In write-behind mode the database is loaded into memory and all operations work with the in-memory copy.
+        Committed changes are written to the database file by a background thread every flush_interval seconds,
+        as soon as flush_rows rows were changed since the last flush, on flush() call and on disconnect.
+
+        Bounded loss: if the process dies, only changes committed after the last completed flush are lost, i.e.
+        changes of at most flush_interval seconds plus duration of one flush. flush_rows only wakes the background
+        thread up after the commit that reached it, so rows committed before the thread starts copying and while
+        the copy is in progress are not flushed either, a single transaction may exceed flush_rows on its own.
+        The database file always holds a consistent state, uncommitted changes are never flushed.
+
+        With shards given, class tables are stored in the shard files attached to the database connection,
+        shard of a table is chosen by shard_by: 'module' - crc32 of class module name, 'class' - crc32 of class
+        table name, or callable taking table name and returning shard index. Queries find tables across shards
+        by name, so every table must be stored in exactly one file. Sharding can not be combined with write-behind
+        mode.
+
         :type db_filepath: str
         :param db_filepath: path to the database file
+        :param write_behind: True to work with in-memory copy of the database flushed to the file periodically
+        :param flush_interval: maximum number of seconds between flushes in write-behind mode
+        :param flush_rows: number of changed rows which triggers flush in write-behind mode
+        :param shards: list of paths to shard database files
+        :param shard_by: 'module', 'class' or callable(table_name) -> shard index
         :return: None
         """
+        if shards and write_behind:
+            raise ValueError('Sharding can not be combined with write-behind mode')
+        if shards and not callable(shard_by) and shard_by not in ('module', 'class'):
+            raise ValueError("'module', 'class' or callable expected as shard_by. Got " + str(shard_by))
+
         self.filename = db_filepath
-        self.connection = sqlite3.connect(db_filepath)
+        if write_behind:
+            self.__disk_connection = sqlite3.connect(db_filepath, check_same_thread=False)
+            self.connection = sqlite3.connect(':memory:', check_same_thread=False)
+            self.__disk_connection.backup(self.connection)
+            self.__flush_rows = flush_rows
+            self.__flushed_changes = self.connection.total_changes
+            self.__flush_stopped = False
+            self.__flush_event.clear()
+            self.__flush_thread = threading.Thread(target=self.__flush_loop, args=(flush_interval,), daemon=True)
+            self.__flush_thread.start()
+        else:
+            self.connection = sqlite3.connect(db_filepath)
         self.cursor = self.connection.cursor()
+        self.__stored_source_hashes = set()
+        self.__table_columns = {}
+        self.__hydration_plans = {}
+
+        self.__shard_filenames = list(shards or [])
+        self.__shard_by = shard_by
+        for i, shard_filepath in enumerate(self.__shard_filenames):
+            self.cursor.execute('ATTACH DATABASE ? AS {}'.format(Py2SQL.__get_shard_schema_name(i)), (shard_filepath,))
+
+        if self.change_log:
+            self.__execute_ddl(
+                'CREATE TABLE IF NOT EXISTS main.{} ({} INTEGER PRIMARY KEY AUTOINCREMENT, {} TEXT, {} INTEGER, {} TEXT, '
+                '{} TEXT)'.format(PY2SQL_CHANGE_LOG_TABLE_NAME, PY2SQL_CHANGE_LOG_SEQ_COLUMN_NAME,
+                                  PY2SQL_CHANGE_LOG_TABLE_COLUMN_NAME, PY2SQL_CHANGE_LOG_ROW_ID_COLUMN_NAME,
+                                  PY2SQL_CHANGE_LOG_OPERATION_COLUMN_NAME, PY2SQL_CHANGE_LOG_COLUMNS_COLUMN_NAME)
+            )
+            self.connection.commit()
 
     def db_disconnect(self) -> None:
         """
         Disconnect from the current database
 
+        In write-behind mode all changes are committed and flushed to the database file first, sqlite3.OperationalError
+        is raised if batch of operations is in progress
+
         :return: None
         """
+        if self.__disk_connection is not None:
+            self.__check_no_batch('flush')
+            self.__flush_stopped = True
+            self.__flush_event.set()
+            self.__flush_thread.join()
+            self.__flush_thread = None
+            try:
+                self.__commit()
+                self.__flush_to_disk()
+            finally:
+                self.__disk_connection.close()
+                self.__disk_connection = None
         self.connection.close()
+        self.__shard_filenames = []
+        self.__shard_by = None
         self.filename = None
         self.connection = None
         self.cursor = None
+        self.__stored_source_hashes = set()
+        self.__table_columns = {}
+        self.__hydration_plans = {}
+
+    def flush(self) -> None:
+        """
+        Commit and write all changes to the database file in write-behind mode, does nothing otherwise
+
+        sqlite3.OperationalError is raised if batch of operations is in progress, as its transaction can not be
+        committed yet and the copy would wait for it forever
+
+        :return: None
+        """
+        if self.__disk_connection is None:
+            return
+
+        self.__check_no_batch('flush')
+        self.__commit()
+        self.__flush_to_disk()
+
+    def __flush_to_disk(self) -> None:
+        """
+        Copy in-memory database to the database file in write-behind mode
+
+        :return: None
+        """
+        with self.__flush_lock:
+            changes = self.connection.total_changes
+            # single step, so that the file never holds half-copied database; waits while transaction is open
+            self.connection.backup(self.__disk_connection, pages=-1)
+            self.__flushed_changes = changes
+
+    def __flush_loop(self, flush_interval) -> None:
+        """
+        Flush changes in write-behind mode until disconnect, run by background thread
+
+        :param flush_interval: maximum number of seconds between flushes
+        :return: None
+        """
+        while not self.__flush_stopped:
+            self.__flush_event.wait(flush_interval)
+            self.__flush_event.clear()
+            if self.__flush_stopped:
+                break
+            try:
+                self.__flush_to_disk()
+            except sqlite3.Error:  # retried on next wake up, final flush on disconnect raises
+                pass
+
+    def __notify_changes(self) -> None:
+        """
+        Wake up background flush in write-behind mode if enough rows were changed since the last flush
+
+        :return: None
+        """
+        if self.__disk_connection is not None and \
+                self.connection.total_changes - self.__flushed_changes >= self.__flush_rows:
+            self.__flush_event.set()
+
+    def db_backup(self, target_path: str, pages_per_step=256, sleep=0.25, progress=None) -> list:
+        """
+        Copy connected database into given file using SQLite online backup.
+
+        Database is copied pages_per_step pages at a time, read lock is held only during a step and this thread
+        sleeps for sleep seconds between steps, so that other connections may write to the database in between.
+        Copy is restarted by SQLite if the database is changed by another connection, so it is always consistent.
+
+        With shards attached, every shard is copied into its own file next to target_path, see __get_backup_paths(),
+        so that the backup can be connected to with the returned shard paths. Files are copied one after another,
+        each of them is consistent on its own.
+
+        :type target_path: str
+        :param target_path: path to the backup database file
+        :param pages_per_step: number of pages copied at a time, -1 to copy whole database at once
+        :param sleep: number of seconds to sleep between steps and before retrying a busy or locked step
+        :param progress: callable progress(status, remaining, total) called after every step
+        :rtype: list
+        :return: paths of written files, main database file first, then shard files in order of shards
+        """
+        self.__check_no_batch('backup')
+        self.__commit()
+
+        def step_done(status, remaining, total):
+            if progress is not None:
+                progress(status, remaining, total)
+            if remaining:
+                time.sleep(sleep)
+
+        paths = self.__get_backup_paths(target_path)
+        for schema, path in zip(self.__get_schema_names(), paths):
+            target = sqlite3.connect(path)
+            try:
+                self.connection.backup(target, pages=pages_per_step, progress=step_done, name=schema, sleep=sleep)
+            finally:
+                target.close()
+        return paths
+
+    def db_vacuum_into(self, target_path: str) -> list:
+        """
+        Write compacted snapshot of connected database into given file
+
+        With shards attached, every shard is written into its own file next to target_path,
+        see __get_backup_paths()
+
+        :type target_path: str
+        :param target_path: path to the snapshot file, must not exist
+        :rtype: list
+        :return: paths of written files, main database file first, then shard files in order of shards
+        """
+        self.__check_no_batch('VACUUM INTO')
+        self.__commit()
+        paths = self.__get_backup_paths(target_path)
+        for schema, path in zip(self.__get_schema_names(), paths):
+            self.cursor.execute('VACUUM {} INTO ?'.format(schema), (path,))
+        return paths
+
+    def __get_backup_paths(self, target_path: str) -> list:
+        """
+        Retrieve paths of files connected database and its shards are copied to by backup or snapshot
+
+        Shard with index i is copied to target_path with '.shard<i>' inserted before extension,
+        e.g. 'backup.shard0.db' for 'backup.db'
+
+        :param target_path: path to the main backup database file
+        :rtype: list
+        :return: path for main database file followed by paths for shards in order of shards
+        """
+        root, ext = os.path.splitext(target_path)
+        return [target_path] + ['{}.{}{}'.format(root, Py2SQL.__get_shard_schema_name(i), ext)
+                                for i in range(len(self.__shard_filenames))]
+
+    def __check_no_batch(self, operation: str) -> None:
+        """
+        Raise sqlite3.OperationalError if batch of operations is in progress, i.e. its transaction is still open
+
+        :param operation: name of operation which can not be done inside a transaction
+        :return: None
+        """
+        if self.__batch_depth:
+            raise sqlite3.OperationalError('Can not ' + operation + ' while batch of operations is in progress')
+
+    def __commit(self) -> None:
+        """
+        Commit current transaction unless batch of operations is in progress
+
+        :return: None
+        """
+        if not self.__batch_depth:
+            self.connection.commit()
+            self.__notify_changes()
+
+    def __begin_batch(self) -> None:
+        """
+        Start batch of operations which are committed at once by the outermost __end_batch() call.
+        Batches may be nested.
+
+        :return: None
+        """
+        self.__batch_depth += 1
+        if self.__batch_depth == 1 and not self.connection.in_transaction:
+            self.cursor.execute('BEGIN')
+
+    def __end_batch(self, success=True) -> None:
+        """
+        Finish batch of operations started by __begin_batch()
+
+        :param success: True to commit, False to roll back the whole outermost batch
+        :return: None
+        """
+        self.__batch_depth -= 1
+        if not self.__batch_depth:
+            if success:
+                self.connection.commit()
+                self.__notify_changes()
+            else:
+                self.connection.rollback()
+                # sources inserted and columns added by the batch are gone, cached state has to be rebuilt
+                self.__stored_source_hashes = set()
+                self.__table_columns.clear()
+                self.__hydration_plans.clear()
+
+    def __execute_ddl(self, query: str) -> None:
+        """
+        Execute given DDL query and count it
+
+        :param query: CREATE, ALTER or DROP query to be executed
+        :return: None
+        """
+        self.cursor.execute(query)
+        self.__ddl_count += 1
+        self.__table_columns.clear()
+        self.__hydration_plans.clear()
+
+    def __get_table_columns(self, table_name) -> list:
+        """
+        Retrieve column names of given table.
+
+        Column names are cached until next DDL query is executed
+
+        :param table_name: table name
+        :rtype: list
+        :return: column names, empty list if there is no such table
+        """
+        columns = self.__table_columns.get(table_name)
+        if columns is None:
+            columns = [column_name for _, column_name, _ in self.db_table_structure(table_name)]
+            self.__table_columns[table_name] = columns
+        return columns
 
     def db_engine(self) -> tuple:
         """
@@ -88,18 +405,62 @@ class Py2SQL:
         :rtype: float
         :return: database size in Mb
         """
-        return os.path.getsize(self.filename) / (1024 * 1024.0)
+        filenames = [self.filename] + self.__shard_filenames
+        return sum(os.path.getsize(f) for f in filenames if os.path.exists(f)) / (1024 * 1024.0)
 
     def db_tables(self):
         """
-        Retrieve all the tables names present in database.
+        Retrieve all the tables names present in database, including shards.
 
         :return: list of database tables names
         """
-        query = "SELECT tbl_name FROM sqlite_master;"
-        self.cursor.execute(query)
-        tables_info = self.cursor.fetchall()
-        return list(map(lambda t: t[0], list(tables_info)))
+        tables = []
+        for schema in self.__get_schema_names():
+            query = "SELECT tbl_name FROM {}.sqlite_master WHERE type = 'table';".format(schema)
+            self.cursor.execute(query)
+            tables_info = self.cursor.fetchall()
+            tables += [t[0] for t in tables_info if t[0] not in tables]
+        return tables
+
+    @staticmethod
+    def __get_shard_schema_name(shard_index: int) -> str:
+        """
+        Retrieve schema name given shard database is attached as
+
+        :param shard_index: index of the shard
+        :rtype: str
+        :return: schema name
+        """
+        return 'shard{}'.format(shard_index)
+
+    def __get_schema_names(self) -> list:
+        """
+        Retrieve names of main schema and all attached shards schemas
+
+        :rtype: list
+        :return: schema names
+        """
+        return ['main'] + [Py2SQL.__get_shard_schema_name(i) for i in range(len(self.__shard_filenames))]
+
+    def __get_table_schema_name(self, table_name: str) -> str:
+        """
+        Retrieve name of the schema new table with given name should be created in
+
+        :param table_name: table name
+        :rtype: str
+        :return: schema name
+        """
+        if not self.__shard_filenames:
+            return 'main'
+
+        if callable(self.__shard_by):
+            shard_index = self.__shard_by(table_name)
+        elif self.__shard_by == 'module':
+            module_name, _ = Py2SQL.__get_class_name_by_table_name(table_name)
+            shard_index = zlib.crc32(module_name.encode('utf-8'))
+        else:
+            shard_index = zlib.crc32(table_name.encode('utf-8'))
+        return Py2SQL.__get_shard_schema_name(shard_index % len(self.__shard_filenames))
 
     def db_table_structure(self, table_name: str) -> list:
         """
@@ -114,39 +475,53 @@ class Py2SQL:
         except sqlite3.OperationalError:
             return []
 
-    def db_table_size(self, table_name: str) -> float:
+    def db_table_size(self, table_name: str, raw=False) -> float:
         """
         Dynamically calculates data size stored in the table with table name provided in Mb.
 
+        Sizes of tables with the same name in all shards are summed up.
+        Compressed values are counted by their stored size, or by their decompressed size if raw is True
+
         :table_name: table name to get size of
+        :param raw: True to get size of data as if it was not compressed
         :rtype: float
         :return: size of table ib Mb
         """
         if not type(table_name) == str:
             raise ValueError("str type expected as table_name. Got " + str(type(table_name)))
-        q = "SELECT * FROM {}".format(table_name)
-        try:
-            self.cursor.execute(q)
-        except Exception:
-            raise Exception('No table' + table_name + ' found')
-        rows = self.cursor.fetchall()
 
-        col_names = list(map(lambda descr_tuple: descr_tuple[0], self.cursor.description))
         int_size = 8
         text_charsize = 2
         bytes_size = 0
-        for r in rows:
-            for i in range(len(r)):
-                if r[i] is None:
-                    continue
-                elif (col_names[i] == PY2SQL_COLUMN_ID_NAME) or (col_names[i] == PY2SQL_OBJECT_PYTHON_ID_COLUMN_NAME):
-                    bytes_size += int_size
-                elif type(r[i]) == int:
-                    bytes_size += int_size
-                elif type(r[i]) == str:
-                    bytes_size += len(r[i].encode('utf-8'))
-                else:
-                    continue
+        found = False
+        for schema in self.__get_schema_names():
+            q = "SELECT * FROM {}.{}".format(schema, table_name)
+            try:
+                self.cursor.execute(q)
+            except sqlite3.OperationalError:
+                continue
+            found = True
+
+            col_names = list(map(lambda descr_tuple: descr_tuple[0], self.cursor.description))
+            for r in self.cursor:
+                for i in range(len(r)):
+                    if r[i] is None:
+                        continue
+                    elif (col_names[i] == PY2SQL_COLUMN_ID_NAME) or \
+                            (col_names[i] == PY2SQL_OBJECT_PYTHON_ID_COLUMN_NAME):
+                        bytes_size += int_size
+                    elif type(r[i]) == int:
+                        bytes_size += int_size
+                    elif type(r[i]) == str:
+                        bytes_size += len(r[i].encode('utf-8'))
+                    elif type(r[i]) == bytes:
+                        value = decompress_sqlite_repr(r[i]) if raw else r[i]
+                        bytes_size += len(value.encode('utf-8')) if type(value) == str else len(value)
+                    else:
+                        continue
+
+        if not found:
+            raise Exception('No table' + table_name + ' found')
 
         return float(bytes_size / 1024 / 1024)
 
@@ -170,7 +545,8 @@ class Py2SQL:
             self.__add_object_attrs_columns(obj, table_name)
             columns = self.__get_object_bound_columns(table_name).split(', ')
             for col in columns[:]:
-                if not Py2SQL.__has_attr_for_column(obj, col):
+                if not Py2SQL.__has_attr_for_column(obj, col) or \
+                        (not self.save_methods and col.startswith(PY2SQL_OBJECT_METHOD_PREFIX)):
                     columns.remove(col)
                     continue
 
@@ -181,13 +557,15 @@ class Py2SQL:
                 attr_value = Py2SQL.__get_attr_for_column(obj, col)
                 if isclass(attr_value):
                     continue
-                values.append(self.__get_sqlite_repr(attr_value))
+                values.append(self.__get_sqlite_repr(attr_value, col))
         else:
             columns = self.__get_object_bound_columns(table_name).split(', ')
-            values = (id(obj), self.__get_sqlite_repr(obj))
+            values = (id(obj), self.__get_sqlite_repr(obj, PY2SQL_PRIMITIVE_TYPES_VALUE_COLUMN_NAME))
 
         obj_pk = self.__get_pk_if_exists(obj)
         if obj_pk:
+            if self.change_log:
+                changed_columns = self.__get_changed_columns(table_name, obj_pk, columns, values)
             query = 'UPDATE {} SET {} WHERE {} = ?'.format(
                 table_name,
                 ', '.join(['{} = ?'.format(c) for c in columns]),
@@ -196,7 +574,9 @@ class Py2SQL:
             params = (*values, obj_pk)
             print(query, params)
             self.cursor.execute(query, params)
-            self.connection.commit()
+            if self.change_log and changed_columns:
+                self.__log_change(table_name, obj_pk, PY2SQL_CHANGE_UPDATE, changed_columns)
+            self.__commit()
             return obj_pk
 
         query = 'INSERT INTO {}({}) VALUES ({});'.format(
@@ -209,7 +589,7 @@ class Py2SQL:
         try:
             self.cursor.execute(query, values)
         except sqlite3.OperationalError:
-            self.cursor.execute(
+            self.__execute_ddl(
                 'ALTER TABLE {} ADD COLUMN {} TEXT'.format(table_name, PY2SQL_PRIMITIVE_TYPES_VALUE_COLUMN_NAME)
             )
             columns = self.__get_object_bound_columns(table_name)
@@ -220,8 +600,78 @@ class Py2SQL:
             )
             self.cursor.execute(query, values)
 
-        self.connection.commit()
-        return self.__get_last_inserted_id()
+        obj_pk = self.__get_last_inserted_id()
+        if self.change_log:
+            self.__log_change(table_name, obj_pk, PY2SQL_CHANGE_INSERT,
+                              columns.split(', ') if isinstance(columns, str) else columns)
+        self.__commit()
+        return obj_pk
+
+    def __get_changed_columns(self, table_name, row_id, columns, values) -> list:
+        """
+        Retrieve columns which values stored in the row with given ID differ from given ones
+
+        :param table_name: table name
+        :param row_id: ID of the row
+        :param columns: column names
+        :param values: new values of the columns
+        :rtype: list
+        :return: names of changed columns
+        """
+        old_values = self.cursor.execute(
+            'SELECT {} FROM {} WHERE {} = ?'.format(', '.join(columns), table_name, PY2SQL_COLUMN_ID_NAME), (row_id,)
+        ).fetchone()
+        if old_values is None:
+            return list(columns)
+        return [c for c, old, new in zip(columns, old_values, values) if old != new]
+
+    def __log_change(self, table_name, row_id, operation, columns=()) -> None:
+        """
+        Append record to the change log table, within the current transaction
+
+        :param table_name: name of the changed table
+        :param row_id: ID of the changed row, None for whole table changes
+        :param operation: one of PY2SQL_CHANGE_* constants
+        :param columns: names of changed columns
+        :return: None
+        """
+        self.cursor.execute(
+            'INSERT INTO main.{}({}, {}, {}, {}) VALUES (?, ?, ?, ?)'.format(
+                PY2SQL_CHANGE_LOG_TABLE_NAME, PY2SQL_CHANGE_LOG_TABLE_COLUMN_NAME, PY2SQL_CHANGE_LOG_ROW_ID_COLUMN_NAME,
+                PY2SQL_CHANGE_LOG_OPERATION_COLUMN_NAME, PY2SQL_CHANGE_LOG_COLUMNS_COLUMN_NAME
+            ),
+            (table_name, row_id, operation, ', '.join(columns))
+        )
+
+    def changes_since(self, seq=0, chunk_size=1000):
+        """
+        Stream change log records with sequence number greater than given one
+
+        Pass sequence number of the last consumed record to continue tailing changes
+
+        :param seq: sequence number of the last consumed record, 0 to read from the beginning
+        :param chunk_size: number of records fetched from the database at once
+        :return: generator of tuples (seq, table name, row ID, operation, list of changed columns)
+        """
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(
+                'SELECT {}, {}, {}, {}, {} FROM main.{} WHERE {} > ? ORDER BY {}'.format(
+                    PY2SQL_CHANGE_LOG_SEQ_COLUMN_NAME, PY2SQL_CHANGE_LOG_TABLE_COLUMN_NAME,
+                    PY2SQL_CHANGE_LOG_ROW_ID_COLUMN_NAME, PY2SQL_CHANGE_LOG_OPERATION_COLUMN_NAME,
+                    PY2SQL_CHANGE_LOG_COLUMNS_COLUMN_NAME, PY2SQL_CHANGE_LOG_TABLE_NAME,
+                    PY2SQL_CHANGE_LOG_SEQ_COLUMN_NAME, PY2SQL_CHANGE_LOG_SEQ_COLUMN_NAME
+                ),
+                (seq,)
+            )
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for seq_, table_name, row_id, operation, columns in rows:
+                    yield seq_, table_name, row_id, operation, columns.split(', ') if columns else []
+        finally:
+            cursor.close()
 
     @staticmethod
     def __get_attr_for_column(obj, column_name):
@@ -358,7 +808,7 @@ class Py2SQL:
         """
         return attr_name.startswith("__") and attr_name.endswith("__")
 
-    def __get_sqlite_repr(self, obj) -> str or None:
+    def __get_sqlite_repr(self, obj, column_name=None) -> str or bytes or None:
         """
         Retrieve SQLite representation of given object
 
@@ -366,10 +816,14 @@ class Py2SQL:
         so that object instances of primitive types can be easily recreated from the database via eval() function
 
         Composite objects are represented by association reference strings, whereas functions are represented with
-        their source code
+        source reference strings pointing to their source code in the shared source table
+
+        Representation stored in object bound column is compressed if compression is enabled and either it is not
+        shorter than compression threshold or the column is listed in compressed columns
 
         :param obj: object to be represented in SQLite database
-        :rtype: str or None
+        :param column_name: name of object bound column representation is stored in, None for class bound values
+        :rtype: str or bytes or None
         :return: sqlite representation of an object to be stored in the respective database table
         """
         if obj is None:
@@ -383,7 +837,7 @@ class Py2SQL:
         elif Py2SQL.__is_of_primitive_type(obj):
             result = '{}({})'.format(type(obj).__name__, obj)
         elif isfunction(obj) or ismethod(obj):
-            result = getsource(obj)
+            return self.__get_source_reference(obj)
         else:  # object
             if obj.__dict__:
                 result = Py2SQL.__get_association_reference(obj, self.save_object(obj))
@@ -391,7 +845,104 @@ class Py2SQL:
                 result = str(obj)
 
         if result is not None:
-            return result.replace("'", '"')
+            result = result.replace("'", '"')
+            if column_name is not None and self.__is_compressed(result, column_name):
+                return compress_sqlite_repr(result, self.compression)
+            return result
+
+    def __is_compressed(self, sqlite_repr: str, column_name: str) -> bool:
+        """
+        Check if given representation should be stored compressed in the column with given name
+
+        :param sqlite_repr: SQLite representation of a value
+        :param column_name: attribute or column name
+        :rtype: bool
+        :return: True if representation should be compressed, False otherwise
+        """
+        if self.compression is None or sqlite_repr.startswith(PY2SQL_ASSOCIATION_REFERENCE_PREFIX):
+            return False
+        if column_name in self.compressed_columns or \
+                Py2SQL.__object_column_name_to_attr_name(column_name) in self.compressed_columns:
+            return True
+        return len(sqlite_repr) >= self.compression_threshold
+
+    def __get_source(self, func) -> tuple:
+        """
+        Retrieve source code of given function or method along with its hash
+
+        Source is cached per code object and invalidated when modification time of the file it was defined in
+        changes, so that inspect.getsource() is called only once per function
+
+        :param func: function or method to get source of
+        :rtype: tuple
+        :return: two-element tuple: source code, sha1 hex digest of source code
+        """
+        code = func.__code__
+        try:
+            mtime = os.path.getmtime(code.co_filename)
+        except OSError:
+            mtime = None
+
+        cached = self.__source_cache.get(code)
+        if cached is not None and cached[0] == mtime:
+            return cached[1], cached[2]
+
+        source = getsource(func)
+        source_hash = hashlib.sha1(source.encode('utf-8')).hexdigest()
+        self.__source_cache[code] = (mtime, source, source_hash)
+        return source, source_hash
+
+    def __get_source_reference(self, func) -> str:
+        """
+        Retrieve source reference string for given function or method i.e. a string that points to its source code
+        stored in the shared source table
+
+        Source code is inserted into the source table only once per connection, identical sources are stored once
+
+        :param func: function or method to get source reference for
+        :rtype: str
+        :return: source reference string
+        """
+        source, source_hash = self.__get_source(func)
+        if source_hash not in self.__stored_source_hashes:
+            self.__execute_ddl(
+                'CREATE TABLE IF NOT EXISTS {} ({} TEXT PRIMARY KEY, {} TEXT)'.format(
+                    PY2SQL_SOURCE_TABLE_NAME, PY2SQL_SOURCE_HASH_COLUMN_NAME, PY2SQL_SOURCE_TEXT_COLUMN_NAME
+                )
+            )
+            self.cursor.execute(
+                'INSERT OR IGNORE INTO {}({}, {}) VALUES (?, ?)'.format(
+                    PY2SQL_SOURCE_TABLE_NAME, PY2SQL_SOURCE_HASH_COLUMN_NAME, PY2SQL_SOURCE_TEXT_COLUMN_NAME
+                ),
+                (source_hash, source)
+            )
+            self.__stored_source_hashes.add(source_hash)
+
+        return PY2SQL_SOURCE_REFERENCE_PREFIX + PY2SQL_SEPARATOR + source_hash
+
+    def get_source_by_reference(self, source_ref: str) -> str or None:
+        """
+        Retrieve source code of function or method stored under given source reference string
+
+        :type source_ref: str
+        :param source_ref: source reference string as stored in CLASS_METHOD or OBJECT_METHOD column
+        :rtype: str or None
+        :return: source code if it is present in the source table, None otherwise
+        """
+        source_hash = source_ref[source_ref.rfind(PY2SQL_SEPARATOR) + 1:]
+        try:
+            row = self.cursor.execute(
+                'SELECT {} FROM {} WHERE {} = ?'.format(
+                    PY2SQL_SOURCE_TEXT_COLUMN_NAME, PY2SQL_SOURCE_TABLE_NAME, PY2SQL_SOURCE_HASH_COLUMN_NAME
+                ),
+                (source_hash,)
+            ).fetchone()
+        except sqlite3.OperationalError:  # source table was never created
+            return None
+
+        if row:
+            return row[0]
+        return None
 
     @staticmethod
     def __is_of_primitive_type(obj) -> bool:
@@ -497,6 +1048,17 @@ class Py2SQL:
             return prefix + cls.__name__
         return prefix + cls.__name__
 
+    @staticmethod
+    def get_class_table_name(cls) -> str:
+        """
+        Retrieve name of the database table used to represent given class
+
+        :param cls: class instance to get table name for
+        :rtype: str
+        :return: name of the table that represents given class
+        """
+        return Py2SQL.__get_class_table_name(cls)
+
     def __table_exists(self, table_name):
         """
         Check if table with table name exists in database
@@ -518,10 +1080,12 @@ class Py2SQL:
         :return: None
         """
         for attr_name, attr_value in obj.__dict__.items():
-            if isclass(attr_value):
+            if isclass(attr_value) or self.__is_skipped_method(attr_value):
+                continue
+            if Py2SQL.__get_object_column_name(attr_name, attr_value) in self.__get_table_columns(table_name):
                 continue
             try:
-                self.cursor.execute(
+                self.__execute_ddl(
                     'ALTER TABLE {} ADD COLUMN {} TEXT'.format(
                         table_name,
                         Py2SQL.__get_object_column_name(attr_name, attr_value)
@@ -530,16 +1094,26 @@ class Py2SQL:
             except sqlite3.OperationalError:  # column already exists
                 pass
 
-    @staticmethod
-    def __get_data_fields(cls_obj):
+    def __is_skipped_method(self, value) -> bool:
+        """
+        Check if given value is function or method which should not be saved because saving methods is disabled
+
+        :param value: value to be checked
+        :rtype: bool
+        :return: True if value should be skipped, False otherwise
+        """
+        return not self.save_methods and (isfunction(value) or ismethod(value))
+
+    def __get_data_fields(self, cls_obj):
         """
         Retrieves from class object data field names.
 
-        Not includes magic attributes and functions (methods)
+        Not includes magic attributes, as well as functions (methods) if saving methods is disabled
         :param cls_obj:
         :return: list of two-element tuples containing data field name and value respectively
         """
-        return [(k, v) for k, v in cls_obj.__dict__.items() if not Py2SQL.__is_magic_attr(k) and PY2SQL_ID_NAME != k]
+        return [(k, v) for k, v in cls_obj.__dict__.items() if not Py2SQL.__is_magic_attr(k) and PY2SQL_ID_NAME != k
+                and not self.__is_skipped_method(v)]
 
     def __table_is_empty(self, table_name) -> bool:
         """
@@ -559,7 +1133,7 @@ class Py2SQL:
         :rtype: str
         :return: comma separated list of object bound column names
         """
-        columns = ', '.join([column_name for _, column_name, _ in self.db_table_structure(table_name) if
+        columns = ', '.join([column_name for column_name in self.__get_table_columns(table_name) if
                              Py2SQL.__is_object_bound_column(column_name)])
         return columns
 
@@ -600,7 +1174,7 @@ class Py2SQL:
         :param columns: columns list which optionally extends class bound columns list
         :return: list of class bound column queries
         """
-        data_fields = Py2SQL.__get_data_fields(cls)
+        data_fields = self.__get_data_fields(cls)
 
         base_ref_columns = ['{} REFERENCES {}(ID) DEFAULT {}'.format(
             Py2SQL.__get_base_class_table_reference_name(b),
@@ -622,15 +1196,14 @@ class Py2SQL:
 
         return base_ref_columns + class_bound_columns + object_bound_columns
 
-    @staticmethod
-    def __get_class_bound_columns(cls) -> list:
+    def __get_class_bound_columns(self, cls) -> list:
         """
         Retrieve list of class bound column names
 
         :param cls: class to retrieve column names for
         :return: list of class bound column names
         """
-        data_fields = Py2SQL.__get_data_fields(cls)
+        data_fields = self.__get_data_fields(cls)
         base_ref_columns = [Py2SQL.__get_base_class_table_reference_name(b) for b in cls.__bases__ if b != object]
         # prevent undesired recursion
         attr_columns = [Py2SQL.__get_class_column_name(k, v) for k, v in data_fields if not type(v) == cls]
@@ -658,7 +1231,7 @@ class Py2SQL:
 
         columns = (set(old_columns) - set(to_be_deleted)) | set(to_be_added)
 
-        self.cursor.execute('ALTER TABLE {} RENAME TO {}$backup;'.format(table_name, table_name))
+        self.__execute_ddl('ALTER TABLE {} RENAME TO {}$backup;'.format(table_name, table_name))
         self.__create_table(cls, columns)
 
         columns_query = ', '.join(columns - set(to_be_added))
@@ -669,8 +1242,8 @@ class Py2SQL:
             query, (PY2SQL_DEFAULT_CLASS_BOUND_ROW_ID,)
         )
 
-        self.cursor.execute('DROP TABLE {}$backup;'.format(table_name))
-        self.connection.commit()
+        self.__execute_ddl('DROP TABLE {}$backup;'.format(table_name))
+        self.__commit()
 
     def __create_table(self, cls, columns=None) -> str:
         """
@@ -681,8 +1254,9 @@ class Py2SQL:
         :return: name of the table created
         """
         table_name = self.__get_class_table_name(cls)
-        query_start = 'CREATE TABLE IF NOT EXISTS {} ({} INTEGER PRIMARY KEY AUTOINCREMENT, {} {}' \
-            .format(table_name,
+        query_start = 'CREATE TABLE IF NOT EXISTS {}.{} ({} INTEGER PRIMARY KEY AUTOINCREMENT, {} {}' \
+            .format(self.__get_table_schema_name(table_name),
+                    table_name,
                     PY2SQL_COLUMN_ID_NAME,
                     PY2SQL_OBJECT_PYTHON_ID_COLUMN_NAME,
                     PY2SQL_OBJECT_PYTHON_ID_COLUMN_TYPE
@@ -700,13 +1274,13 @@ class Py2SQL:
             query = query_start + ' ' + columns_query + ')'
 
         print(query)
-        self.cursor.execute(query)
+        self.__execute_ddl(query)
 
         if not self.__is_primitive_type(cls):
             if self.__table_is_empty(table_name):
                 self.cursor.execute('INSERT INTO {} DEFAULT VALUES'.format(table_name))
 
-        self.connection.commit()
+        self.__commit()
 
         return table_name
 
@@ -728,21 +1302,244 @@ class Py2SQL:
         if not self.__is_primitive_type(cls):
             self.__update_table(cls)
 
-        self.connection.commit()
+        self.__commit()
+
+    @staticmethod
+    def __get_hierarchy(root_class, with_bases=True) -> list:
+        """
+        Retrieve deduplicated list of root_class and all classes derived from it, optionally extended with
+        all their base classes (MRO).
+
+        Classes are ordered so that every class goes after its base classes present in the list
+
+        :param root_class: root class of the hierarchy
+        :param with_bases: True to include base classes of every class in the hierarchy
+        :rtype: list
+        :return: ordered list of classes
+        """
+        closure = {}  # dict preserves discovery order
+        to_visit = [root_class]
+        while to_visit:
+            cls = to_visit.pop()
+            if cls in closure:
+                continue
+            closure[cls] = None
+            to_visit.extend(type.__subclasses__(cls))
+
+        if with_bases:
+            for cls in list(closure):
+                closure.update((b, None) for b in cls.__mro__[1:] if b != object)
+
+        ordered = []
+        placed = set()
+
+        def place(c):
+            if c in placed or c not in closure:
+                return
+            placed.add(c)
+            for base in c.__bases__:
+                place(base)
+            ordered.append(c)
+
+        for cls in closure:
+            place(cls)
+
+        return ordered
 
-    def save_hierarchy(self, root_class) -> None:
+    def save_hierarchy(self, root_class) -> int:
         """
         Saves all classes derived from root_class and classes these classes depends on
 
+        Whole class closure is computed up front, tables are created or updated in dependency order
+        inside a single transaction.
+
         :param root_class: Base class to save with all derived classes
-        :return: None
+        :rtype: int
+        :return: number of DDL statements issued
         """
-        self.save_class(root_class)
-        subclasses = root_class.__subclasses__()
-        if len(subclasses) == 0:
-            return
-        for c in subclasses:
-            self.save_hierarchy(c)
+        ddl_count = self.__ddl_count
+        existing_tables = set(self.db_tables())
+
+        self.__begin_batch()
+        try:
+            for cls in Py2SQL.__get_hierarchy(root_class):
+                table_name = Py2SQL.__get_class_table_name(cls)
+                if table_name not in existing_tables:
+                    self.__create_table(cls)
+                    existing_tables.add(table_name)
+                elif not self.__is_primitive_type(cls):
+                    self.__update_table(cls)
+        except Exception:
+            self.__end_batch(success=False)
+            raise
+        self.__end_batch()
+
+        return self.__ddl_count - ddl_count
+
+    def bulk_import(self, cls, rows, columns=None, encoded=False, defer_indexes=False) -> int:
+        """
+        Insert rows representing objects of given class without creating the objects themselves
+
+        Rows are validated against table columns once and inserted with executemany() inside a single transaction,
+        PY2SQL_IMPORT_CHUNK_SIZE rows at a time. Columns for attributes missing in the table are added before
+        the import.
+
+        Rows are dicts mapping attribute (or column) names to values, or tuples of values ordered as columns.
+        If columns are not given, keys of the first dict row are used, for tuple rows - object attribute columns
+        of the table in their order. Rows without py_id get unique negative py_id.
+
+        :param cls: class which objects the rows represent
+        :param rows: iterable of dicts or tuples
+        :param columns: attribute (or column) names, values of each row correspond to
+        :param encoded: True if values are already in SQLite representation, False to convert them
+        :param defer_indexes: True to drop indexes of the table during the import and recreate them afterwards
+        :rtype: int
+        :return: number of rows inserted
+        """
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return 0
+
+        self.save_class(cls)
+        table_name = Py2SQL.__get_class_table_name(cls)
+
+        if columns is None:
+            if isinstance(first, dict):
+                columns = list(first.keys())
+            else:
+                columns = [c for c in self.__get_object_bound_columns(table_name).split(', ')
+                           if c and c != PY2SQL_OBJECT_PYTHON_ID_COLUMN_NAME]
+        column_names = [self.__get_import_column_name(table_name, c) for c in columns]
+        if len(set(column_names)) != len(column_names):
+            raise ValueError('Duplicate columns: ' + str(columns))
+
+        has_py_id = PY2SQL_OBJECT_PYTHON_ID_COLUMN_NAME in column_names
+        if not has_py_id:
+            column_names.append(PY2SQL_OBJECT_PYTHON_ID_COLUMN_NAME)
+
+        index_queries = []
+        self.__begin_batch()
+        try:
+            for c in column_names:
+                if c not in self.__get_table_columns(table_name):
+                    self.__execute_ddl('ALTER TABLE {} ADD COLUMN {} TEXT'.format(table_name, c))
+
+            if defer_indexes:
+                index_queries = self.__drop_indexes(table_name)
+
+            min_py_id = self.cursor.execute('SELECT min({}) FROM {}'.format(
+                PY2SQL_OBJECT_PYTHON_ID_COLUMN_NAME, table_name
+            )).fetchone()[0]
+            next_py_id = min(min_py_id or 0, 0) - 1
+
+            query = 'INSERT INTO {}({}) VALUES ({});'.format(
+                table_name, ', '.join(column_names), ', '.join('?' * len(column_names))
+            )
+            last_id = self.cursor.execute('SELECT max({}) FROM {}'.format(PY2SQL_COLUMN_ID_NAME, table_name)) \
+                .fetchone()[0]
+            # encoding may save associated objects and sources with the same cursor, so every chunk is encoded
+            # before executemany() starts reading it
+            params = self.__get_import_params(first, rows, columns, encoded, has_py_id, next_py_id)
+            count = 0
+            chunk = list(islice(params, PY2SQL_IMPORT_CHUNK_SIZE))
+            while chunk:
+                self.cursor.executemany(query, chunk)
+                count += self.cursor.rowcount
+                chunk = list(islice(params, PY2SQL_IMPORT_CHUNK_SIZE))
+
+            if self.change_log:
+                self.cursor.execute(
+                    'INSERT INTO main.{}({}, {}, {}, {}) SELECT ?, {}, ?, ? FROM {} WHERE {} > ? ORDER BY {}'.format(
+                        PY2SQL_CHANGE_LOG_TABLE_NAME, PY2SQL_CHANGE_LOG_TABLE_COLUMN_NAME,
+                        PY2SQL_CHANGE_LOG_ROW_ID_COLUMN_NAME, PY2SQL_CHANGE_LOG_OPERATION_COLUMN_NAME,
+                        PY2SQL_CHANGE_LOG_COLUMNS_COLUMN_NAME, PY2SQL_COLUMN_ID_NAME, table_name,
+                        PY2SQL_COLUMN_ID_NAME, PY2SQL_COLUMN_ID_NAME
+                    ),
+                    (table_name, PY2SQL_CHANGE_INSERT, ', '.join(column_names), last_id or 0)
+                )
+
+            for q in index_queries:
+                self.__execute_ddl(q)
+        except Exception:
+            self.__end_batch(success=False)
+            raise
+        self.__end_batch()
+
+        return count
+
+    def __get_import_column_name(self, table_name, name) -> str:
+        """
+        Retrieve name of the column bulk imported values with given name are stored in
+
+        :param table_name: name of the table values are imported into
+        :param name: attribute or column name
+        :rtype: str
+        :return: column name
+        """
+        if not isinstance(name, str) or not name.replace(PY2SQL_SEPARATOR, '_').isidentifier():
+            raise ValueError('Invalid column name: ' + str(name))
+        if name == PY2SQL_OBJECT_PYTHON_ID_COLUMN_NAME or Py2SQL.__is_object_bound_column(name):
+            return name
+        if name in self.__get_table_columns(table_name):
+            raise ValueError('Column is not object bound: ' + name)
+        return PY2SQL_OBJECT_ATTR_PREFIX + PY2SQL_SEPARATOR + name
+
+    def __get_import_params(self, first, rows, columns, encoded, has_py_id, next_py_id):
+        """
+        Generate parameters of insert query for every bulk imported row
+
+        :param first: first row
+        :param rows: iterator over the rest of rows
+        :param columns: names of values in each row
+        :param encoded: True if values are already in SQLite representation
+        :param has_py_id: True if rows contain py_id
+        :param next_py_id: py_id for the first row without it, decremented for every next one
+        :return: generator of tuples
+        """
+        column_set = set(columns)
+        py_id_index = columns.index(PY2SQL_OBJECT_PYTHON_ID_COLUMN_NAME) if has_py_id else -1
+
+        for r in chain((first,), rows):
+            if isinstance(r, dict):
+                if len(r) > len(column_set) or not r.keys() <= column_set:
+                    raise ValueError('Unexpected columns: ' + str(set(r.keys()) - column_set))
+                values = [r.get(c) for c in columns]
+            else:
+                if len(r) != len(columns):
+                    raise ValueError('Expected {} values, got {}'.format(len(columns), len(r)))
+                values = list(r)
+
+            if not encoded:
+                values = [v if i == py_id_index else self.__get_sqlite_repr(v, columns[i]) for i, v in enumerate(values)]
+            if not has_py_id:
+                values.append(next_py_id)
+                next_py_id -= 1
+            yield values
+
+    def __drop_indexes(self, table_name) -> list:
+        """
+        Drop user defined indexes of given table
+
+        Index name in the returned queries is qualified with the schema index was found in, as SQLite stores
+        CREATE INDEX statements without schema and they would recreate the index in the main schema otherwise
+
+        :param table_name: table name
+        :rtype: list
+        :return: queries recreating dropped indexes
+        """
+        indexes = []
+        for schema in self.__get_schema_names():
+            indexes += [(schema, name, sql) for name, sql in self.cursor.execute(
+                "SELECT name, sql FROM {}.sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL"
+                .format(schema),
+                (table_name,)
+            ).fetchall()]
+        for schema, name, _ in indexes:
+            self.__execute_ddl('DROP INDEX {}."{}"'.format(schema, name))
+        return [PY2SQL_INDEX_NAME_PATTERN.sub(
+            lambda m: '{}{}."{}"'.format(m.group(1), schema, name.replace('"', '""')), sql, count=1
+        ) for schema, name, sql in indexes]
 
     def delete_object(self, obj) -> None:
         """
@@ -752,16 +1549,26 @@ class Py2SQL:
         :return: None
         """
         table_name = Py2SQL.__get_object_table_name(obj)
+        if self.change_log:
+            deleted_ids = [r[0] for r in self.cursor.execute(
+                'SELECT {} FROM {} WHERE {} = ?;'.format(
+                    PY2SQL_COLUMN_ID_NAME, table_name, PY2SQL_OBJECT_PYTHON_ID_COLUMN_NAME
+                ),
+                (id(obj),)
+            ).fetchall()]
         self.cursor.execute(
             'DELETE FROM {} WHERE {} = ?;'.format(table_name, PY2SQL_OBJECT_PYTHON_ID_COLUMN_NAME), (id(obj),)
         )
+        if self.change_log:
+            for deleted_id in deleted_ids:
+                self.__log_change(table_name, deleted_id, PY2SQL_CHANGE_DELETE)
 
         if not Py2SQL.__is_of_primitive_type(obj):  # object
             for value in obj.__dict__.values():
                 if not Py2SQL.__is_of_primitive_type(value) and isclass(value):
                     self.delete_object(value)  # cascade delete
 
-        self.connection.commit()
+        self.__commit()
 
     def __get_objects(self, cls):
         return self.cursor.execute('SELECT * from {};'.format(Py2SQL.__get_class_table_name(cls))).fetchall()
@@ -792,29 +1599,47 @@ class Py2SQL:
                         ref_id = entry.split(PY2SQL_SEPARATOR)[-1]
                         self.cursor.execute(
                             'DELETE FROM {} WHERE {} = ?;'.format(ref_table_name, PY2SQL_COLUMN_ID_NAME),
-                            ref_id
+                            (ref_id,)
                         )
+                        if self.change_log and self.cursor.rowcount:
+                            self.__log_change(ref_table_name, int(ref_id), PY2SQL_CHANGE_DELETE)
                         if self.__table_is_empty(ref_table_name):
-                            self.cursor.execute('DROP TABLE IF EXISTS {}'.format(ref_table_name))
+                            self.__execute_ddl('DROP TABLE IF EXISTS {}'.format(ref_table_name))
+                            if self.change_log:
+                                self.__log_change(ref_table_name, None, PY2SQL_CHANGE_DROP)
 
-        self.cursor.execute(query)
-        self.connection.commit()
+        if self.change_log and self.__table_exists(tbl_name):
+            self.__log_change(tbl_name, None, PY2SQL_CHANGE_DROP)
+        self.__execute_ddl(query)
+        self.__commit()
 
-    def delete_hierarchy(self, root_class) -> None:
+    def delete_hierarchy(self, root_class) -> int:
         """
         Deletes root_class representation from database with all derived classes.
 
         Drops class corresponding table and all derived classes corresponding tables.
+        Tables are dropped in reverse dependency order (derived classes first) inside a single transaction.
         :param root_class: Class which representation to be deleted with all derived classes
-        :return: None
+        :rtype: int
+        :return: number of DDL statements issued
         """
-        # consider foreign key constraints! todo
-        self.delete_class(root_class)
-        subclasses = root_class.__subclasses__()
-        if len(subclasses) == 0:
-            return
-        for c in subclasses:
-            self.delete_hierarchy(c)
+        ddl_count = self.__ddl_count
+        existing_tables = set(self.db_tables())
+
+        self.__begin_batch()
+        try:
+            for cls in reversed(Py2SQL.__get_hierarchy(root_class, with_bases=False)):
+                table_name = Py2SQL.__get_class_table_name(cls)
+                if table_name in existing_tables:
+                    self.__execute_ddl('DROP TABLE IF EXISTS {}'.format(table_name))
+                    if self.change_log:
+                        self.__log_change(table_name, None, PY2SQL_CHANGE_DROP)
+        except Exception:
+            self.__end_batch(success=False)
+            raise
+        self.__end_batch()
+
+        return self.__ddl_count - ddl_count
 
     def __redefine_id_function(self, my_id):
         """
@@ -893,20 +1718,6 @@ class Py2SQL:
 
         return w
 
-    def __get_columns_names(self, table_name) -> list:
-        """
-        Retrieves from database table columns name for table with name provided
-
-        :param table_name: table name
-        :rtype: list
-        :return: columns names
-        """
-
-        self.cursor.execute('PRAGMA table_info({})'.format(table_name))
-        rows = self.cursor.fetchall()
-
-        return list(map(lambda t: t[1], list(rows)))
-
     @staticmethod
     def __get_tbl_nm_and_id_assoc(association_ref_value: str) -> tuple:
         """
@@ -920,6 +1731,83 @@ class Py2SQL:
         id_ = int(association_ref_value[association_ref_value.rfind(PY2SQL_SEPARATOR) + 1:])
         return tbl_name, id_
 
+    def __get_hydration_plan(self, table_name) -> HydrationPlan:
+        """
+        Retrieve plan of converting rows of given table into objects.
+
+        Plans are built on first use and cached until next DDL query is executed
+
+        :param table_name: table name
+        :rtype: HydrationPlan
+        :return: hydration plan
+        """
+        plan = self.__hydration_plans.get(table_name)
+        if plan is not None:
+            return plan
+
+        cls_o = Py2SQL.__get_class_object_by_table_name(table_name)
+        plan = HydrationPlan(cls_o, Py2SQL.__is_primitive_type(cls_o))
+        base_ref_prefix = PY2SQL_BASE_CLASS_REFERENCE_PREFIX + PY2SQL_SEPARATOR
+        object_attr_prefix = PY2SQL_OBJECT_ATTR_PREFIX + PY2SQL_SEPARATOR
+        for i, col_name in enumerate(self.__get_table_columns(table_name)):
+            if col_name == PY2SQL_COLUMN_ID_NAME:
+                plan.id_index = i
+            elif col_name == PY2SQL_OBJECT_PYTHON_ID_COLUMN_NAME:
+                plan.py_id_index = i
+            elif plan.is_primitive:
+                if col_name == PY2SQL_PRIMITIVE_TYPES_VALUE_COLUMN_NAME:
+                    plan.value_index = i
+            elif col_name.startswith(base_ref_prefix):
+                plan.base_refs.append((i, col_name[len(base_ref_prefix):]))
+            elif col_name.startswith(object_attr_prefix):
+                attr_real_name = col_name[len(object_attr_prefix):]
+                if attr_real_name.startswith("__"):
+                    attr_real_name = "_" + cls_o.__name__ + attr_real_name
+                plan.attrs.append((i, attr_real_name))
+
+        self.__hydration_plans[table_name] = plan
+        return plan
+
+    def __decode_attr_value(self, value):
+        """
+        Recreate object attribute value stored in the database, loading associated objects
+
+        :param value: value fetched from the database
+        :return: attribute value
+        """
+        value = decompress_sqlite_repr(value)
+        if isinstance(value, str) and value.startswith(PY2SQL_ASSOCIATION_REFERENCE_PREFIX):
+            tbl_nm, prm_id = Py2SQL.__get_tbl_nm_and_id_assoc(value)
+            return self.get_object_by_id(tbl_nm, prm_id)[0]
+        return from_sqlite_repr(value)
+
+    def __hydrate(self, plan, row, parent_obj=None):
+        """
+        Convert table row into object according to given plan
+
+        :param plan: hydration plan of the table
+        :param row: row fetched from the table
+        :param parent_obj: object to set attributes of instead of creating new one
+        :return: object
+        """
+        if plan.is_primitive:
+            if plan.value_index is None:
+                return None
+            return plan.cls(from_sqlite_repr(row[plan.value_index]))
+
+        obj = parent_obj if parent_obj is not None else plan.cls.__new__(plan.cls)
+        for i, ref_tbl_name in plan.base_refs:
+            if row[i] is not None:
+                self.get_object_by_id(ref_tbl_name, int(row[i]), obj)
+
+        values = {attr_name: self.__decode_attr_value(row[i]) for i, attr_name in plan.attrs if row[i] is not None}
+        if hasattr(obj, '__dict__'):
+            obj.__dict__.update(values)
+        else:
+            for attr_name, value in values.items():
+                setattr(obj, attr_name, value)
+        return obj
+
     def get_object_by_id(self, table_name: str, id_: int, parent_obj=None) -> tuple:
         """
         Retrieves the object related data from table with table name and converts it into the object.
@@ -931,50 +1819,36 @@ class Py2SQL:
         py_id, db_id = -1, -1
 
         try:
-            cls_o = Py2SQL.__get_class_object_by_table_name(table_name)
-            obj = cls_o.__new__(cls_o)
-            cols_names = self.__get_columns_names(table_name)
-            q = "SELECT * FROM {} WHERE {}={}".format(table_name, PY2SQL_COLUMN_ID_NAME, id_)
-            self.cursor.execute(q)
-            row = self.cursor.fetchone()
-
-            if Py2SQL.__is_primitive_type(cls_o):
-                for i in range(len(row)):
-                    if cols_names[i] == PY2SQL_COLUMN_ID_NAME:
-                        db_id = row[i]
-                    elif cols_names[i] == PY2SQL_OBJECT_PYTHON_ID_COLUMN_NAME:
-                        py_id = row[i]
-                    elif cols_names[i] == PY2SQL_PRIMITIVE_TYPES_VALUE_COLUMN_NAME:
-                        ob = cls_o(eval(row[i]))
-            else:
-                if parent_obj is not None:
-                    obj = parent_obj
-                for i in range(len(row)):
-                    if cols_names[i] == PY2SQL_COLUMN_ID_NAME:
-                        db_id = row[i]
-                    elif cols_names[i] == PY2SQL_OBJECT_PYTHON_ID_COLUMN_NAME:
-                        py_id = row[i]
-                    elif cols_names[i].startswith(PY2SQL_BASE_CLASS_REFERENCE_PREFIX):
-                        ref_tbl_name = cols_names[i][cols_names[i].rfind(PY2SQL_SEPARATOR) + 1:]
-                        ref_id = int(row[i])
-                        self.get_object_by_id(ref_tbl_name, ref_id, obj)
-                    elif cols_names[i].startswith(PY2SQL_OBJECT_ATTR_PREFIX):
-                        attr_real_name = cols_names[cols_names.rfind(PY2SQL_SEPARATOR) + 1:]
-                        if row[i].startswith(PY2SQL_ASSOCIATION_REFERENCE_PREFIX):
-                            tbl_nm, prm_id = Py2SQL.__get_tbl_nm_and_id_assoc(row[i])
-                            if attr_real_name.startswith("__"):
-                                attr_mdf = "_" + cls_o.__name__ + attr_real_name
-                                setattr(obj, attr_mdf, self.get_object_by_id(tbl_nm, prm_id)[0])
-                            else:
-                                setattr(obj, attr_real_name, self.get_object_by_id(tbl_nm, prm_id)[0])
-                        else:
-                            if attr_real_name.startswith("__"):
-                                attr_mdf = "_" + cls_o.__name__ + attr_real_name
-                                setattr(obj, attr_mdf, row[i])
-                            else:
-                                setattr(obj, attr_real_name, row[i])
-                ob = obj
-
+            plan = self.__get_hydration_plan(table_name)
+            q = "SELECT * FROM {} WHERE {}=?".format(table_name, PY2SQL_COLUMN_ID_NAME)
+            row = self.cursor.execute(q, (id_,)).fetchone()
+            if row is not None:
+                db_id, py_id = row[plan.id_index], row[plan.py_id_index]
+                ob = self.__hydrate(plan, row, parent_obj)
         except Exception:
             print("exc")
         return ob, db_id, py_id
+
+    def iter_objects(self, table_name: str, chunk_size=1000):
+        """
+        Retrieves all objects stored in the table with table name, row holding class attributes is skipped.
+
+        Rows are fetched chunk_size at a time using single query
+        :param table_name: table name to retrieve objects from
+        :param chunk_size: number of rows fetched from the database at once
+        :return: generator of tuples (object, row id, python id) ordered by row id
+        """
+        plan = self.__get_hydration_plan(table_name)
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("SELECT * FROM {} WHERE {} IS NOT NULL ORDER BY {}".format(
+                table_name, PY2SQL_OBJECT_PYTHON_ID_COLUMN_NAME, PY2SQL_COLUMN_ID_NAME
+            ))
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield self.__hydrate(plan, row), row[plan.id_index], row[plan.py_id_index]
+        finally:
+            cursor.close()
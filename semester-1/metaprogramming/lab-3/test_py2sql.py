@@ -0,0 +1,241 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import unittest
+from contextlib import closing
+from unittest import mock
+
+from demo_classes import A, B, AssociatedClass
+from export import Py2SQLExporter
+from py2sql import Py2SQL
+from util import *
+
+
+class Py2SQLTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.dir, 'test.db')
+        self.py2sql = Py2SQL()
+
+    def tearDown(self):
+        if self.py2sql.connection is not None:
+            self.py2sql.db_disconnect()
+        shutil.rmtree(self.dir)
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+
+class BulkImportTest(Py2SQLTestCase):
+    def test_import_object_and_function_values(self):
+        self.py2sql.db_connect(self.db_path)
+        table_name = Py2SQL.get_class_table_name(AssociatedClass)
+        associated = AssociatedClass()
+        associated.set_object_attr = {'associated'}
+
+        count = self.py2sql.bulk_import(AssociatedClass, [
+            {'set_object_attr': associated, 'x': 5},
+            {'set_object_attr': lambda: 1, 'x': 6},
+        ])
+
+        self.assertEqual(count, 2)
+        attr_column = PY2SQL_OBJECT_ATTR_PREFIX + PY2SQL_SEPARATOR + 'set_object_attr'
+        values = [r[0] for r in self.py2sql.cursor.execute(
+            'SELECT {} FROM {} WHERE {} < 0 ORDER BY {}'.format(
+                attr_column, table_name, PY2SQL_OBJECT_PYTHON_ID_COLUMN_NAME, PY2SQL_COLUMN_ID_NAME
+            )
+        )]
+        self.assertEqual(len(values), 2)
+        self.assertTrue(values[0].startswith(PY2SQL_ASSOCIATION_REFERENCE_PREFIX))
+        self.assertTrue(values[1].startswith(PY2SQL_SOURCE_REFERENCE_PREFIX))
+        self.assertIn('lambda: 1', self.py2sql.get_source_by_reference(values[1]))
+
+    def test_import_more_rows_than_chunk(self):
+        self.py2sql.db_connect(self.db_path)
+        count = self.py2sql.bulk_import(AssociatedClass, ({'x': i} for i in range(PY2SQL_IMPORT_CHUNK_SIZE + 1)))
+        self.assertEqual(count, PY2SQL_IMPORT_CHUNK_SIZE + 1)
+
+    def test_source_reference_after_rolled_back_import(self):
+        self.py2sql.db_connect(self.db_path)
+        func = lambda: 2
+        with self.assertRaises(ValueError):
+            self.py2sql.bulk_import(AssociatedClass, [{'x': func}, {'zz': 2}])
+
+        self.py2sql.bulk_import(AssociatedClass, [{'set_object_attr': func}])
+        ref = self.py2sql.cursor.execute('SELECT {} FROM {} WHERE {} < 0'.format(
+            PY2SQL_OBJECT_ATTR_PREFIX + PY2SQL_SEPARATOR + 'set_object_attr',
+            Py2SQL.get_class_table_name(AssociatedClass), PY2SQL_OBJECT_PYTHON_ID_COLUMN_NAME
+        )).fetchone()[0]
+        self.assertIn('lambda: 2', self.py2sql.get_source_by_reference(ref))
+
+    def test_retry_after_rolled_back_import(self):
+        self.py2sql.db_connect(self.db_path)
+        with self.assertRaises(ValueError):
+            self.py2sql.bulk_import(AssociatedClass, [{'y': 1}, {'zz': 2}])
+
+        self.assertEqual(self.py2sql.bulk_import(AssociatedClass, [{'y': 1}]), 1)
+
+
+class BackupTest(Py2SQLTestCase):
+    def test_backup_sleeps_between_steps(self):
+        self.py2sql.db_connect(self.db_path)
+        self.py2sql.bulk_import(AssociatedClass, ({'x': 'x' * 100} for _ in range(1000)))
+        steps = []
+        with mock.patch('py2sql.time.sleep') as sleep:
+            self.py2sql.db_backup(self.path('backup.db'), pages_per_step=4, sleep=0.5,
+                                  progress=lambda status, remaining, total: steps.append(remaining))
+
+        self.assertGreater(len(steps), 1)
+        self.assertEqual(steps[-1], 0)
+        self.assertEqual(sleep.call_args_list, [mock.call(0.5)] * (len(steps) - 1))
+        table_name = Py2SQL.get_class_table_name(AssociatedClass)
+        with closing(sqlite3.connect(self.path('backup.db'))) as backup:
+            self.assertEqual(backup.execute('SELECT count(*) FROM ' + table_name).fetchone()[0], 1001)
+
+    def assert_sharded_copy(self, paths):
+        self.assertEqual(paths, [self.path('copy.db'), self.path('copy.shard0.db'), self.path('copy.shard1.db')])
+        copy = Py2SQL()
+        copy.db_connect(paths[0], shards=paths[1:])
+        try:
+            for cls, rows in ((A, 3), (B, 4), (AssociatedClass, 5)):
+                table_name = Py2SQL.get_class_table_name(cls)
+                self.assertEqual(copy.cursor.execute('SELECT count(*) FROM {} WHERE {} < 0'.format(
+                    table_name, PY2SQL_OBJECT_PYTHON_ID_COLUMN_NAME
+                )).fetchone()[0], rows)
+        finally:
+            copy.db_disconnect()
+
+    def connect_sharded(self):
+        self.py2sql.db_connect(self.db_path, shards=[self.path('shard0.db'), self.path('shard1.db')])
+        for cls, rows in ((A, 3), (B, 4), (AssociatedClass, 5)):
+            self.py2sql.bulk_import(cls, [{'x': i} for i in range(rows)])
+
+    def test_backup_copies_shards(self):
+        self.connect_sharded()
+        self.assert_sharded_copy(self.py2sql.db_backup(self.path('copy.db')))
+
+    def test_vacuum_into_copies_shards(self):
+        self.connect_sharded()
+        self.assert_sharded_copy(self.py2sql.db_vacuum_into(self.path('copy.db')))
+
+    def test_import_deferring_indexes_of_sharded_table(self):
+        self.connect_sharded()
+        table_name = Py2SQL.get_class_table_name(AssociatedClass)
+        schema, = [s for s in ('shard0', 'shard1') if self.py2sql.cursor.execute(
+            'SELECT 1 FROM {}.sqlite_master WHERE name = ?'.format(s), (table_name,)
+        ).fetchone()]
+        x_column = PY2SQL_OBJECT_ATTR_PREFIX + PY2SQL_SEPARATOR + 'x'
+        self.py2sql.cursor.execute('CREATE INDEX {}."ix x" ON "{}"({})'.format(schema, table_name, x_column))
+
+        self.assertEqual(self.py2sql.bulk_import(AssociatedClass, [{'x': 7}], defer_indexes=True), 1)
+        self.assertEqual(self.py2sql.cursor.execute(
+            "SELECT tbl_name FROM {}.sqlite_master WHERE type = 'index' AND name = 'ix x'".format(schema)
+        ).fetchall(), [(table_name,)])
+        self.assertIsNone(self.py2sql.cursor.execute(
+            "SELECT 1 FROM main.sqlite_master WHERE name = 'ix x'"
+        ).fetchone())
+
+    def test_vacuum_into_inside_batch_raises(self):
+        self.py2sql.db_connect(self.db_path)
+        self.py2sql._Py2SQL__begin_batch()
+        try:
+            with self.assertRaises(sqlite3.OperationalError):
+                self.py2sql.db_vacuum_into(self.path('snapshot.db'))
+        finally:
+            self.py2sql._Py2SQL__end_batch()
+        self.py2sql.db_vacuum_into(self.path('snapshot.db'))
+        self.assertTrue(os.path.exists(self.path('snapshot.db')))
+
+
+class WriteBehindTest(Py2SQLTestCase):
+    table_name = Py2SQL.get_class_table_name(AssociatedClass)
+
+    def persisted_rows(self):
+        """ Returns number of AssociatedClass objects in the database file, as a reopening process would see it """
+        with closing(sqlite3.connect(self.db_path)) as disk:
+            if not disk.execute('SELECT 1 FROM sqlite_master WHERE name = ?', (self.table_name,)).fetchone():
+                return 0
+            return disk.execute('SELECT count(*) FROM {} WHERE {} < 0'.format(
+                self.table_name, PY2SQL_OBJECT_PYTHON_ID_COLUMN_NAME
+            )).fetchone()[0]
+
+    def wait_persisted_rows(self, expected, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while self.persisted_rows() != expected and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.persisted_rows()
+
+    def test_changes_are_persisted_only_by_flush(self):
+        self.py2sql.db_connect(self.db_path, write_behind=True, flush_interval=3600, flush_rows=10 ** 9)
+        self.py2sql.bulk_import(AssociatedClass, [{'x': i} for i in range(10)])
+        time.sleep(0.1)
+        self.assertEqual(self.persisted_rows(), 0)
+
+        self.py2sql.flush()
+        self.assertEqual(self.persisted_rows(), 10)
+
+        self.py2sql.bulk_import(AssociatedClass, [{'x': i} for i in range(5)])
+        time.sleep(0.1)
+        self.assertEqual(self.persisted_rows(), 10)  # lost if the process died now
+
+        self.py2sql.db_disconnect()
+        self.assertEqual(self.persisted_rows(), 15)
+
+    def test_flush_rows_triggers_flush(self):
+        self.py2sql.db_connect(self.db_path, write_behind=True, flush_interval=3600, flush_rows=100)
+        self.py2sql.bulk_import(AssociatedClass, [{'x': i} for i in range(50)])
+        time.sleep(0.1)
+        self.assertEqual(self.persisted_rows(), 0)
+
+        self.py2sql.bulk_import(AssociatedClass, [{'x': i} for i in range(50)])
+        self.assertEqual(self.wait_persisted_rows(100), 100)
+
+    def test_flush_interval_triggers_flush(self):
+        self.py2sql.db_connect(self.db_path, write_behind=True, flush_interval=0.05, flush_rows=10 ** 9)
+        self.py2sql.bulk_import(AssociatedClass, [{'x': i} for i in range(10)])
+        self.assertEqual(self.wait_persisted_rows(10), 10)
+
+    def test_flush_inside_batch_raises(self):
+        self.py2sql.db_connect(self.db_path, write_behind=True, flush_interval=3600, flush_rows=10 ** 9)
+        self.py2sql._Py2SQL__begin_batch()
+        try:
+            self.py2sql.bulk_import(AssociatedClass, [{'x': 1}])
+            with self.assertRaises(sqlite3.OperationalError):
+                self.py2sql.flush()
+            with self.assertRaises(sqlite3.OperationalError):
+                self.py2sql.db_disconnect()
+        finally:
+            self.py2sql._Py2SQL__end_batch()
+        self.py2sql.db_disconnect()
+        self.assertEqual(self.persisted_rows(), 1)
+
+
+class NumpyExportTest(Py2SQLTestCase):
+    def setUp(self):
+        super().setUp()
+        self.py2sql.db_connect(self.db_path)
+        self.py2sql.bulk_import(AssociatedClass, [{'x': 2 ** 70, 'y': 1}, {'x': -5, 'y': 2}])
+        self.exporter = Py2SQLExporter(self.py2sql)
+
+    def test_integers_outside_int64_are_exported_as_strings(self):
+        import numpy as np
+
+        self.assertEqual(self.exporter.to_numpy(AssociatedClass, self.path('export.npy')), 2)
+        data = np.load(self.path('export.npy'))
+        x, y = (PY2SQL_OBJECT_ATTR_PREFIX + PY2SQL_SEPARATOR + c for c in ('x', 'y'))
+        self.assertEqual(data.dtype[x].kind, 'U')
+        self.assertEqual(list(data[x]), [str(2 ** 70), '-5'])
+        self.assertEqual(data.dtype[y], np.dtype('i8'))
+        self.assertEqual(list(data[y]), [1, 2])
+
+    def test_failed_export_removes_file(self):
+        with mock.patch.object(Py2SQLExporter, 'iter_chunks', side_effect=OverflowError):
+            with self.assertRaises(OverflowError):
+                self.exporter.to_numpy(AssociatedClass, self.path('export.npy'))
+        self.assertFalse(os.path.exists(self.path('export.npy')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,11 @@
     Module responsible for decorator for classes to use in py2sql
 """
 
+import lzma
+import re
+import zlib
+from array import array
+
 PY2SQL_ID_NAME = '___id'
 PY2SQL_COLUMN_STUB_NAME = '___stub'
 PY2SQL_COLUMN_STUB_TYPE = 'TEXT'
@@ -12,6 +17,7 @@ PY2SQL_OBJECT_ATTR_PREFIX = 'OBJECT_ATTR'
 PY2SQL_OBJECT_METHOD_PREFIX = 'OBJECT_METHOD'
 PY2SQL_BASE_CLASS_REFERENCE_PREFIX = 'BASE_REF'
 PY2SQL_ASSOCIATION_REFERENCE_PREFIX = 'ASSOCIATION_REF'
+PY2SQL_SOURCE_REFERENCE_PREFIX = 'SOURCE_REF'
 PY2SQL_SEPARATOR = '$'
 
 PY2SQL_COLUMN_ID_TYPE = "INTEGER"
@@ -21,6 +27,29 @@ PY2SQL_OBJECT_PYTHON_ID_COLUMN_TYPE = 'INTEGER'
 PY2SQL_OBJECT_PYTHON_ID_COLUMN_NAME = 'py_id'
 PY2SQL_DEFAULT_CLASS_BOUND_ROW_ID = 1
 
+PY2SQL_SOURCE_TABLE_NAME = 'py2sql$source'
+PY2SQL_SOURCE_HASH_COLUMN_NAME = 'hash'
+PY2SQL_SOURCE_TEXT_COLUMN_NAME = 'source'
+
+PY2SQL_CHANGE_LOG_TABLE_NAME = 'py2sql$changes'
+PY2SQL_CHANGE_LOG_SEQ_COLUMN_NAME = 'seq'
+PY2SQL_CHANGE_LOG_TABLE_COLUMN_NAME = 'table_name'
+PY2SQL_CHANGE_LOG_ROW_ID_COLUMN_NAME = 'row_id'
+PY2SQL_CHANGE_LOG_OPERATION_COLUMN_NAME = 'operation'
+PY2SQL_CHANGE_LOG_COLUMNS_COLUMN_NAME = 'columns'
+PY2SQL_CHANGE_INSERT = 'INSERT'
+PY2SQL_CHANGE_UPDATE = 'UPDATE'
+PY2SQL_CHANGE_DELETE = 'DELETE'
+PY2SQL_CHANGE_DROP = 'DROP'
+
+PY2SQL_COMPRESSION_HEADERS = {'zlib': b'z', 'lzma': b'x'}
+
+# index name in CREATE INDEX statement as stored in sqlite_master, i.e. without schema and IF NOT EXISTS
+PY2SQL_INDEX_NAME_PATTERN = re.compile(r'^(CREATE\s+(?:UNIQUE\s+)?INDEX\s+)(?:"(?:[^"]|"")*"|\[[^\]]*\]|`[^`]*`|\w+)',
+                                       re.IGNORECASE)
+
+PY2SQL_IMPORT_CHUNK_SIZE = 1000  # bulk imported rows encoded before each executemany()
+
 
 def get_pk_attr(obj, suffix=''):
     pk_column_name = PY2SQL_ID_NAME + suffix
@@ -35,6 +64,73 @@ def get_pk_attr(obj, suffix=''):
     return pk_column_name
 
 
+def compress_sqlite_repr(value: str, compression: str) -> bytes:
+    """
+    Compress SQLite representation of a value made by Py2SQL.
+
+    Compressed value is prefixed with one byte header naming compression used,
+    so that it can be decompressed regardless of the current settings.
+
+    :param value: SQLite representation of a value
+    :param compression: 'zlib' or 'lzma'
+    :return: compressed value
+    """
+    data = value.encode('utf-8')
+    if compression == 'zlib':
+        data = zlib.compress(data)
+    elif compression == 'lzma':
+        data = lzma.compress(data)
+    else:
+        raise ValueError("'zlib' or 'lzma' expected as compression. Got " + str(compression))
+    return PY2SQL_COMPRESSION_HEADERS[compression] + data
+
+
+def decompress_sqlite_repr(value):
+    """
+    Reverse compress_sqlite_repr(), values which are not compressed are returned as is
+
+    :param value: value fetched from the database
+    :return: SQLite representation of a value
+    """
+    if not isinstance(value, bytes) or not value:
+        return value
+    header, data = value[:1], value[1:]
+    if header == PY2SQL_COMPRESSION_HEADERS['zlib']:
+        return zlib.decompress(data).decode('utf-8')
+    if header == PY2SQL_COMPRESSION_HEADERS['lzma']:
+        return lzma.decompress(data).decode('utf-8')
+    return value
+
+
+def from_sqlite_repr(value):
+    """
+    Recreate python value from its SQLite representation made by Py2SQL.
+
+    Reference strings (association, base class and source references) and values which
+    can not be evaluated are returned as is. Compressed values are decompressed first.
+
+    :param value: value fetched from the database
+    :return: python value
+    """
+    value = decompress_sqlite_repr(value)
+    if not isinstance(value, str):
+        return value
+    if value.startswith((PY2SQL_ASSOCIATION_REFERENCE_PREFIX, PY2SQL_BASE_CLASS_REFERENCE_PREFIX,
+                         PY2SQL_SOURCE_REFERENCE_PREFIX)):
+        return value
+    try:
+        # fast paths for the most common representations, eval() for the rest
+        if value.startswith('str("') and value.endswith('")'):
+            return value[5:-2]
+        if value.startswith('int(') and value.endswith(')'):
+            return int(value[4:-1])
+        if value.startswith('float(') and value.endswith(')'):
+            return float(value[6:-1])
+        return eval(value, {'array': array})
+    except Exception:
+        return value
+
+
 def model_py2sql(c):
     """
     Decorator for data models.
@@ -78,3 +174,19 @@ class ModelPy2SQL:
         else updated.
         """
         self.__id = id_
+
+
+class HydrationPlan:
+    """
+    Precomputed description of how rows of a table are converted into objects.
+    """
+    __slots__ = ('cls', 'is_primitive', 'id_index', 'py_id_index', 'value_index', 'base_refs', 'attrs')
+
+    def __init__(self, cls, is_primitive):
+        self.cls = cls
+        self.is_primitive = is_primitive
+        self.id_index = None
+        self.py_id_index = None
+        self.value_index = None
+        self.base_refs = []  # (column index, base class table name)
+        self.attrs = []  # (column index, attribute name with name mangling resolved)
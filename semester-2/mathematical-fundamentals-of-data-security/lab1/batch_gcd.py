@@ -0,0 +1,101 @@
+from concurrent.futures import ProcessPoolExecutor
+from math import gcd
+
+try:
+    from gmpy2 import mpz  # subquadratic division keeps remainder tree quasi-linear, CPython int division is quadratic
+except ImportError:
+    mpz = int
+
+CHUNK_SIZE = 256  # tree nodes per task sent to a worker process
+
+
+def read_moduli(path):
+    """ Yields moduli from file, one per line, decimal or 0x-prefixed hex, blank lines and # comments are skipped """
+    with open(path) as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                yield int(line, 0)
+
+
+def _multiply_pairs(level):
+    return [level[i] * level[i + 1] if i + 1 < len(level) else level[i] for i in range(0, len(level), 2)]
+
+
+def _reduce_by_squares(pairs):
+    return [rem % (v * v) for rem, v in pairs]
+
+
+def _map_chunks(executor, fn, items, step=1):
+    """ Applies fn to chunks of items (chunk boundaries are multiples of step) in executor, Returns joined results """
+    size = CHUNK_SIZE * step
+    chunks = [items[i:i + size] for i in range(0, len(items), size)]
+    if executor is None or len(chunks) == 1:
+        results = map(fn, chunks)
+    else:
+        results = executor.map(fn, chunks)
+    return [v for chunk in results for v in chunk]
+
+
+def product_tree(values, executor=None):
+    """ Returns levels of product tree, levels[0] = values, levels[-1] = [product of all values] """
+    levels = [list(values)]
+    while len(levels[-1]) > 1:
+        levels.append(_map_chunks(executor, _multiply_pairs, levels[-1], step=2))
+    return levels
+
+
+def batch_gcd(moduli, workers=None):
+    """
+    Returns list of gcd(N, product of all other moduli) for every modulus N (Bernstein's batch GCD).
+    Product tree is reduced back by remainder tree mod N^2, each level is split among workers processes
+    (workers=1 to stay in this process)
+    """
+    moduli = [mpz(n) for n in moduli]
+    if not moduli:
+        return []
+
+    executor = None if workers == 1 else ProcessPoolExecutor(workers)
+    try:
+        tree = product_tree(moduli, executor)
+        rems = tree[-1]
+        for level in reversed(tree[:-1]):
+            rems = _map_chunks(executor, _reduce_by_squares, [(rems[i // 2], v) for i, v in enumerate(level)])
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return [int(gcd(rem // n, n)) for rem, n in zip(rems, moduli)]
+
+
+def shared_factors(moduli, gcds):
+    """
+    Returns list of (i, j, factor) for every pair of moduli i < j with common factor.
+    Only moduli with gcd > 1 from batch_gcd are compared
+    """
+    weak = [i for i, g in enumerate(gcds) if g > 1]
+    pairs = []
+    for k, i in enumerate(weak):
+        for j in weak[k + 1:]:
+            factor = gcd(moduli[i], moduli[j])
+            if factor > 1:
+                pairs.append((i, j, factor))
+    return pairs
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Find moduli sharing prime factors by batch GCD')
+    parser.add_argument('path', help='file with one modulus per line')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes, 1 to run in this process')
+    arguments = parser.parse_args()
+
+    start = time.perf_counter()
+    moduli = list(read_moduli(arguments.path))
+    gcds = batch_gcd(moduli, arguments.workers)
+    pairs = shared_factors(moduli, gcds)
+    print(f'{len(moduli)} moduli, {sum(g > 1 for g in gcds)} with shared factors, '
+          f'{time.perf_counter() - start:.2f}s')
+    for i, j, factor in pairs:
+        print(f'moduli {i + 1} and {j + 1} share factor {factor}')
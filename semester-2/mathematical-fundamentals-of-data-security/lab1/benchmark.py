@@ -0,0 +1,46 @@
+import random
+import sys
+import time
+
+from euclid import LEHMER_DIGIT_BITS, lehmer_bezout
+
+BITS = (256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+WORK_BITS = 1 << 17  # pairs per size = WORK_BITS // bits
+
+
+def classic_bezout(a, b):
+    """ bezout loop without Lehmer steps at any size """
+    a, b = max(a, b), min(a, b)
+    u0, v0, u1, v1 = 1, 0, 0, 1
+    while b:
+        q = a // b
+        a, b = b, a - q * b
+        u0, v0, u1, v1 = u1, v1, u0 - q * u1, v0 - q * v1
+    return a, u0, v0
+
+
+def best_time(fn, pairs, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for a, b in pairs:
+            fn(a, b)
+        best = min(best, time.perf_counter() - start)
+    return best / len(pairs)
+
+
+if __name__ == '__main__':
+    digit_bits = int(sys.argv[1]) if len(sys.argv) > 1 else LEHMER_DIGIT_BITS
+    rnd = random.Random(0)
+    crossover = None  # smallest size from which lehmer stays faster
+    print(f'{"bits":>6} {"classic, us":>12} {"lehmer, us":>12} {"speedup":>8}')
+    for bits in BITS:
+        pairs = [(rnd.getrandbits(bits), rnd.getrandbits(bits)) for _ in range(max(WORK_BITS // bits, 3))]
+        classic = best_time(classic_bezout, pairs)
+        lehmer = best_time(lambda a, b: lehmer_bezout(a, b, digit_bits), pairs)
+        if lehmer >= classic:
+            crossover = None
+        elif crossover is None:
+            crossover = bits
+        print(f'{bits:>6} {classic * 1e6:>12.1f} {lehmer * 1e6:>12.1f} {classic / lehmer:>8.2f}')
+    print('lehmer is faster from', crossover, 'bits')
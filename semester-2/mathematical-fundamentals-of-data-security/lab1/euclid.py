@@ -0,0 +1,192 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+INT64_MAX = np.iinfo(np.int64).max
+LEHMER_DIGIT_BITS = 62
+LEHMER_THRESHOLD_BITS = 2048  # bezout switches to lehmer_bezout above it, see benchmark.py
+
+
+def forward_line(a, q, b, r):
+    return f'{a} = {q} * {b} + {r}\n'
+
+
+def backward_line(a, q, b, r, u, v):
+    u_sign = '-' if u < 0 else ''
+    v_sign = '+' if v > 0 else '-'
+    return f'{r} = {a} - {q} * {b} = {u_sign}{abs(u)}a {v_sign} {abs(v)}b\n'
+
+
+class ListTrace(list):
+    """ Keeps division steps in memory as tuples (a, q, b, r, u, v), r = a - q * b = u * a0 + v * b0 """
+
+    def step(self, a, q, b, r, u, v):
+        self.append((a, q, b, r, u, v))
+
+    def forward_lines(self):
+        return [forward_line(a, q, b, r) for a, q, b, r, _, _ in self]
+
+    def backward_lines(self):
+        return [backward_line(a, q, b, r, u, v) for a, q, b, r, u, v in self if r]
+
+
+class FileTrace:
+    """ Appends division steps to forward and backward files, files are opened once and written through a buffer """
+
+    def __init__(self, forward_filename, backward_filename, buffer_size=1 << 16):
+        self.forward_filename = forward_filename
+        self.backward_filename = backward_filename
+        self.buffer_size = buffer_size
+        self.forward = self.backward = None
+
+    def __enter__(self):
+        self.forward = open(self.forward_filename, 'a', buffering=self.buffer_size)
+        self.backward = open(self.backward_filename, 'a', buffering=self.buffer_size)
+        return self
+
+    def __exit__(self, *exc):
+        self.forward.close()
+        self.backward.close()
+
+    def step(self, a, q, b, r, u, v):
+        self.forward.write(forward_line(a, q, b, r))
+        if r:
+            self.backward.write(backward_line(a, q, b, r, u, v))
+
+
+def bezout(a, b, trace=None):
+    """
+    Input a, b >= 0, Returns (d, u, v), d = gcd(a, b) = u * a + v * b, larger of a, b is taken as the first one.
+    Every division step is passed to trace.step(a, q, b, r, u, v) if trace is given,
+    without trace numbers longer than LEHMER_THRESHOLD_BITS are handled by lehmer_bezout
+    """
+    a, b = max(a, b), min(a, b)
+    if b == 0:
+        return a, 1, 0
+
+    r0, r1 = a, b
+    u0, v0, u1, v1 = 1, 0, 0, 1
+    if trace is None:
+        if b.bit_length() > LEHMER_THRESHOLD_BITS:
+            return lehmer_bezout(a, b)
+        while r1:
+            q = r0 // r1
+            r0, r1 = r1, r0 - q * r1
+            u0, v0, u1, v1 = u1, v1, u0 - q * u1, v0 - q * v1
+    else:
+        while r1:
+            q, r = divmod(r0, r1)
+            trace.step(r0, q, r1, r, u0 - q * u1, v0 - q * v1)
+            r0, r1 = r1, r
+            u0, v0, u1, v1 = u1, v1, u0 - q * u1, v0 - q * v1
+    return r0, u0, v0
+
+
+def lehmer_bezout(a, b, digit_bits=LEHMER_DIGIT_BITS):
+    """
+    Same as bezout without trace. While numbers are long, quotients are found from their leading digit_bits bits
+    and several Euclid steps are applied at once as 2x2 matrix (Lehmer, Knuth's algorithm L)
+    """
+    a, b = max(a, b), min(a, b)
+    u0, v0, u1, v1 = 1, 0, 0, 1
+    while b.bit_length() > digit_bits:
+        shift = a.bit_length() - digit_bits
+        x, y = a >> shift, b >> shift
+        m00, m01, m10, m11 = 1, 0, 0, 1
+        while y + m10 and y + m11:
+            q = (x + m00) // (y + m10)
+            if q != (x + m01) // (y + m11):
+                break
+            m00, m10 = m10, m00 - q * m10
+            m01, m11 = m11, m01 - q * m11
+            x, y = y, x - q * y
+
+        if m01 == 0:  # leading digits gave no step, one full division
+            q = a // b
+            a, b = b, a - q * b
+            u0, v0, u1, v1 = u1, v1, u0 - q * u1, v0 - q * v1
+        else:
+            a, b = m00 * a + m01 * b, m10 * a + m11 * b
+            u0, u1 = m00 * u0 + m01 * u1, m10 * u0 + m11 * u1
+            v0, v1 = m00 * v0 + m01 * v1, m10 * v0 + m11 * v1
+
+    while b:
+        q = a // b
+        a, b = b, a - q * b
+        u0, v0, u1, v1 = u1, v1, u0 - q * u1, v0 - q * v1
+    return a, u0, v0
+
+
+def extended_gcd(a, b, c, trace=None):
+    """ Returns (d, (u, v), (s, t)), d = gcd(a, b) = u * a + v * b, c = s * a + t * b if d | c """
+    d, u, v = bezout(a, b, trace)
+    return d, (u, v), (c * u // d, c * v // d)
+
+
+def _bezout_int64(a, b):
+    """ Input int64 arrays a, b >= 0, Returns arrays d, u, v, bezout vectorized over pairs """
+    r0, r1 = np.maximum(a, b), np.minimum(a, b)
+    d, u, v = r0.copy(), np.ones_like(r0), np.zeros_like(r0)
+    u0, v0 = np.ones_like(r0), np.zeros_like(r0)
+    u1, v1 = np.zeros_like(r0), np.ones_like(r0)
+    index = np.arange(len(r0))
+    while len(index):
+        active = r1 != 0
+        done = index[~active]
+        d[done], u[done], v[done] = r0[~active], u0[~active], v0[~active]
+        index, r0, r1, u0, u1, v0, v1 = (x[active] for x in (index, r0, r1, u0, u1, v0, v1))
+
+        q = r0 // np.maximum(r1, 1)
+        r0, r1 = r1, r0 - q * r1
+        u0, u1 = u1, u0 - q * u1
+        v0, v1 = v1, v0 - q * v1
+    return d, u, v
+
+
+def _scale_int64(c, u, d):
+    """ Returns c * u // d, int64 array or object array if c * u overflows int64 """
+    overflow = np.abs(c) > INT64_MAX // np.maximum(np.abs(u), 1)
+    if not overflow.any():
+        return c * u // d
+    result = (np.where(overflow, 0, c) * u // d).astype(object)
+    result[overflow] = [ci * ui // di for ci, ui, di in zip(c[overflow].tolist(), u[overflow].tolist(),
+                                                              d[overflow].tolist())]
+    return result
+
+
+def _extended_gcd_chunk(rows):
+    return [(d, u, v, s, t) for d, (u, v), (s, t) in (extended_gcd(a, b, c) for a, b, c in rows)]
+
+
+def _fits_int64(x):
+    if x.dtype.kind in 'iu':
+        return x.dtype.kind == 'i' or not len(x) or x.max() <= INT64_MAX
+    return not len(x) or -INT64_MAX <= min(x) and max(x) <= INT64_MAX
+
+
+def extended_gcd_many(a, b, c, workers=None, chunk_size=1 << 12):
+    """
+    Input equal length sequences of a, b >= 0 (not both zero) and c, Returns arrays d, u, v, s, t of extended_gcd
+    for every (a, b, c). Values fitting int64 are solved by vectorized Euclid, big integers by extended_gcd in chunks
+    of chunk_size rows spread over workers processes (workers=1 to stay in this process)
+    """
+    a, b, c = (x if isinstance(x, np.ndarray) else np.array(list(x), dtype=object) for x in (a, b, c))
+    if all(_fits_int64(x) for x in (a, b, c)):
+        a, b, c = a.astype(np.int64), b.astype(np.int64), c.astype(np.int64)
+        d, u, v = _bezout_int64(a, b)
+        return d, u, v, _scale_int64(c, u, d), _scale_int64(c, v, d)
+
+    rows = list(zip(a.tolist(), b.tolist(), c.tolist()))
+    chunks = [rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size)]
+    if workers == 1 or len(chunks) <= 1:
+        results = list(map(_extended_gcd_chunk, chunks))
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            results = list(executor.map(_extended_gcd_chunk, chunks))
+
+    columns = np.empty((5, len(rows)), dtype=object)
+    start = 0
+    for chunk in results:
+        columns[:, start:start + len(chunk)] = np.array(chunk, dtype=object).T
+        start += len(chunk)
+    return tuple(columns)
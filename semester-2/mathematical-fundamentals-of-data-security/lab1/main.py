@@ -1,45 +1,14 @@
 import os
 import time
 
+import numpy as np
 
-def gcd(a, b, c, forward_filename, backward_filename, u=None, v=None, u_prev=None, v_prev=None, u_prev_prev=None,
-        v_prev_prev=None):
-    a, b = max(a, b), min(a, b)
-
-    with open(forward_filename, 'a+') as f:
-        f.write(f'{a} = {a // b} * {b} + {a % b}\n')
-
-    if a % b == 0:
-        d = b
-        s = c * u // b
-        t = c * v // b
-        return b, (u, v), (s, t)
-    else:
-        m = -(a // b)
-        if u is None and v is None:
-            u = 1
-            v = m
-        else:
-            if u_prev is None and v_prev is None:
-                u_prev = u
-                v_prev = v
-                u = u * m
-                v = v * m + 1
-            else:
-                u_prev_prev, v_prev_prev = u_prev, v_prev
-                u_prev, v_prev = u, v
-                u = u * m + u_prev_prev
-                v = v * m + v_prev_prev
-
-        u_sign, v_sign = '', '-'
-        if v > 0:
-            v_sign = '+'
-        if u < 0:
-            u_sign = '-'
-        with open(backward_filename, 'a+') as f:
-            f.write(f'{a % b} = {a} - {-m} * {b} = {u_sign}{abs(u)}a {v_sign} {abs(v)}b\n')
-
-        return gcd(b, a % b, c, forward_filename, backward_filename, u, v, u_prev, v_prev)
+from euclid import FileTrace, extended_gcd, extended_gcd_many
+
+
+def gcd(a, b, c, forward_filename, backward_filename):
+    with FileTrace(forward_filename, backward_filename) as trace:
+        return extended_gcd(a, b, c, trace)
 
 
 if __name__ == '__main__':
@@ -57,4 +26,19 @@ if __name__ == '__main__':
     for i in range(100):
         d = gcd(a1, b1, c1, forward_filename, backward_filename)
         # print(d)
-    print((time.time() - t) / 100)
+    print('traced:', (time.time() - t) / 100)
+
+    t = time.time()
+    for i in range(100):
+        d = extended_gcd(a1, b1, c1)
+    print('untraced:', (time.time() - t) / 100)
+
+    a, b = np.random.default_rng(0).integers(1, b3, (2, 100_000))
+    c = np.full_like(a, c2)
+    t = time.time()
+    for x, y, z in zip(a.tolist(), b.tolist(), c.tolist()):
+        extended_gcd(x, y, z)
+    print('100000 pairs one by one:', time.time() - t)
+    t = time.time()
+    extended_gcd_many(a, b, c)
+    print('100000 pairs batch:', time.time() - t)
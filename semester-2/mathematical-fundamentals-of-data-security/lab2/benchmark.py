@@ -0,0 +1,109 @@
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from big_primes import big_prime, big_prime_chain, miller_rabin, primes_from_2_to, primes_in_range, product_tree
+from primality import is_prime, is_prime_many
+
+SIEVE_SIZES = (10 ** 5, 10 ** 6, 10 ** 7, 10 ** 8)
+MILLER_RABIN_BITS = ((64, 2000), (512, 500), (2048, 50), (4096, 10))  # (bits, numbers tested)
+CHAIN_LENGTHS = (3, 5)
+CHAIN_PRIMES_LIMIT = 140_000
+
+
+def measure(fn, args=(), repeat=3):
+    """ Returns (best wall time of repeat runs, tracemalloc peak of one more run in bytes) """
+    seconds = float('inf')
+    for _ in range(repeat):
+        random.seed(0)
+        start = time.perf_counter()
+        fn(*args)
+        seconds = min(seconds, time.perf_counter() - start)
+
+    random.seed(0)
+    tracemalloc.start()
+    try:
+        fn(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return seconds, peak
+
+
+def big_prime_sequence(p, count, primes, tree):
+    for _ in range(count):
+        p = big_prime(p, primes, tree)
+    return p
+
+
+def cases():
+    """ Yields (group, name, params, fn, args, items) where items is the amount of work used for throughput """
+    for n in SIEVE_SIZES:
+        yield 'sieve', 'primes_from_2_to', {'n': n}, primes_from_2_to, (n,), n
+        yield 'sieve', 'primes_in_range', {'n': n}, primes_in_range, (0, n), n
+
+    rng = random.Random(0)
+    for bits, count in MILLER_RABIN_BITS:
+        numbers = [rng.getrandbits(bits) | 1 << bits - 1 | 1 for _ in range(count)]
+        yield 'primality', 'miller_rabin', {'bits': bits, 'k': 40, 'numbers': count}, \
+            lambda ns: [miller_rabin(n, 40) for n in ns], (numbers,), count
+        yield 'primality', 'is_prime', {'bits': bits, 'numbers': count}, \
+            lambda ns: [is_prime(n) for n in ns], (numbers,), count
+
+    numbers = np.random.default_rng(0).integers(4, 1 << 63, 100_000, dtype=np.uint64)
+    yield 'primality', 'is_prime_many', {'bits': 64, 'numbers': len(numbers)}, is_prime_many, (numbers,), len(numbers)
+
+    primes = primes_from_2_to(CHAIN_PRIMES_LIMIT).tolist()
+    tree = product_tree(primes)
+    for length in CHAIN_LENGTHS:
+        yield 'big_prime', 'big_prime', {'chain': length, 'primes_limit': CHAIN_PRIMES_LIMIT}, \
+            big_prime_sequence, (primes[-1], length, primes, tree), length
+        yield 'big_prime', 'big_prime_chain', {'chain': length, 'primes_limit': CHAIN_PRIMES_LIMIT}, \
+            big_prime_chain, (primes[-1], length, primes, tree), length
+
+
+def run(groups=None, repeat=3):
+    """ Runs benchmark cases of given groups (all if None), Returns list of result dicts """
+    results = []
+    for group, name, params, fn, args, items in cases():
+        if groups and group not in groups:
+            continue
+        seconds, peak = measure(fn, args, repeat)
+        results.append({
+            'group': group,
+            'name': name,
+            'params': params,
+            'seconds': seconds,
+            'peak_bytes': peak,
+            'items': items,
+            'items_per_second': items / seconds if seconds else None,
+        })
+        print(f'{group:<10} {name:<17} {json.dumps(params):<50} {seconds:10.4f}s {peak / 2 ** 20:10.2f} MiB '
+              f'{items / max(seconds, 1e-9):14.1f}/s')
+    return results
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark prime generation and primality testing')
+    parser.add_argument('output', nargs='?', default='benchmark.json', help='JSON file to write results to')
+    parser.add_argument('--group', action='append', choices=('sieve', 'primality', 'big_prime'),
+                        help='run only given group, can be repeated')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per case, the best is recorded')
+    arguments = parser.parse_args()
+
+    report = {
+        'python': sys.version,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': run(arguments.group, arguments.repeat),
+    }
+    with open(arguments.output, 'w') as f:
+        json.dump(report, f, indent=2)
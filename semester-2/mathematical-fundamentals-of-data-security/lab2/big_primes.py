@@ -1,7 +1,13 @@
+import os
 import random
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from math import gcd, isqrt
 
 import numpy as np
 
+REMAINDER_TREE_MIN_BITS = 4096  # below it n % p for every prime is faster than remainder tree
+
 
 def primes_from_2_to(n):
     """ Input n>=6, Returns a array of primes, 2 <= p < n """
@@ -14,6 +20,38 @@ def primes_from_2_to(n):
     return np.r_[2, 3, ((3 * np.nonzero(sieve)[0][1:] + 1) | 1)]
 
 
+def primes_segments(lo, hi, segment_size=1 << 18):
+    """ Yields arrays of primes lo <= p < hi, segment by segment, each segment covers segment_size odd numbers """
+    lo = max(lo, 2)
+    if hi <= lo:
+        return
+    if lo == 2:
+        yield np.array([2], dtype=np.int64)
+
+    limit = isqrt(hi - 1) + 1
+    base = primes_from_2_to(max(limit, 6))
+    base = base[(base > 2) & (base < limit)].astype(np.int64)
+
+    start = max(lo, 3) | 1
+    while start < hi:
+        stop = min(start + 2 * segment_size, hi)
+        sieve = np.ones((stop - start + 1) // 2, dtype=bool)  # sieve[i] <=> start + 2 * i is prime
+
+        ps = base[base * base < stop]
+        first = np.maximum(ps * ps, (start + ps - 1) // ps * ps)
+        first += ps * (first % 2 == 0)  # first odd multiple
+        for p, i in zip(ps.tolist(), ((first - start) // 2).tolist()):
+            sieve[i::p] = False
+
+        yield start + 2 * np.nonzero(sieve)[0].astype(np.int64)
+        start = stop + (stop % 2 == 0)
+
+
+def primes_in_range(lo, hi, segment_size=1 << 18):
+    """ Returns a array of primes, lo <= p < hi, sieved segment by segment """
+    return np.concatenate([np.empty(0, dtype=np.int64), *primes_segments(lo, hi, segment_size)])
+
+
 def miller_rabin(n, k):
     if n == 2:
         return True
@@ -39,21 +77,224 @@ def miller_rabin(n, k):
     return True
 
 
-def big_prime(s, primes):
-    for r in range(s, 4 * s + 3):
+def product_tree(values):
+    """ Returns levels of product tree, levels[0] = values, levels[-1] = [product of all values] """
+    levels = [[int(v) for v in values]]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        levels.append([level[i] * level[i + 1] if i + 1 < len(level) else level[i] for i in range(0, len(level), 2)])
+    return levels
+
+
+def remainder_tree(n, tree):
+    """ Returns list of n % v for every value v of tree[0], tree is built by product_tree """
+    if not tree[0]:
+        return []
+    if n.bit_length() <= REMAINDER_TREE_MIN_BITS:
+        return [n % v for v in tree[0]]
+    rems = [n % tree[-1][0]]
+    for level in reversed(tree[:-1]):
+        rems = [rems[i // 2] % v for i, v in enumerate(level)]
+    return rems
+
+
+def pow_mod(a, e, m):
+    """ Input int64 arrays, m < 2^31 (or uint64 arrays, m < 2^32), Returns a array of a^e mod m """
+    result = np.ones_like(a)
+    a, e = a % m, e.copy()
+    while e.any():
+        result = np.where(e & 1, result * a % m, result)
+        a = a * a % m
+        e >>= 1
+    return result
+
+
+def candidates(s, r_lo, r_hi, tree, block_size=1 << 12):
+    """
+    Yields r, r_lo <= r < r_hi, such that s * r + 1 is not divisible by any prime of tree[0]
+
+    s * r + 1 = 0 (mod p) <=> r = -s^-1 (mod p), so for every prime it is enough to know offset of the next such r.
+    Offsets are computed once with remainder tree, then moved by addition from block to block of r values.
+    """
+    ps = np.array(tree[0], dtype=np.int64)
+    s_mod = np.array(remainder_tree(s, tree), dtype=np.int64)
+    r_lo_mod = np.array(remainder_tree(r_lo, tree), dtype=np.int64)
+
+    keep = s_mod != 0  # p | s never divides s * r + 1
+    ps, s_mod, r_lo_mod = ps[keep], s_mod[keep], r_lo_mod[keep]
+    roots = -pow_mod(s_mod, ps - 2, ps) % ps  # s^-1 = s^(p-2) (mod p)
+    offsets = (roots - r_lo_mod) % ps  # offsets[i] = min j >= 0, p_i | s * (r_lo + j) + 1
+
+    small = ps < block_size
+    small_ps, large_ps = ps[small], ps[~small]
+    small_offsets, large_offsets = offsets[small], offsets[~small]
+
+    for start in range(r_lo, r_hi, block_size):
+        size = min(block_size, r_hi - start)
+        composite = np.zeros(size, dtype=bool)
+        for p, j in zip(small_ps.tolist(), small_offsets.tolist()):
+            composite[j::p] = True
+        composite[large_offsets[large_offsets < size]] = True
+
+        for j in np.flatnonzero(~composite).tolist():
+            yield start + j
+
+        small_offsets = (small_offsets - size) % small_ps
+        large_offsets = (large_offsets - size) % large_ps
+
+
+def big_prime(s, primes, tree=None):
+    """ Returns smallest prime n = s * r + 1, s <= r <= 4s + 2, tree = product_tree(primes) can be reused between calls """
+    tree = product_tree(primes) if tree is None else tree
+    for r in candidates(s, s, 4 * s + 3, tree):
         n = s * r + 1
-        for p in primes:
-            if n % p == 0:
-                break
-        else:
-            if miller_rabin(n, 40):
-                return n
+        if miller_rabin(n, 40):
+            return n
+
+
+def _is_square(d):
+    return d >= 0 and isqrt(d) ** 2 == d
+
+
+def pocklington_witness(n, s):
+    """
+    Input n = s * r + 1, s prime, n <= s^3, Returns a proving n is prime or None if n is composite
+
+    a^(n-1) = 1 (mod n) and gcd(a^((n-1)/s) - 1, n) = 1 mean every prime factor of n is 1 (mod s).
+    That proves n is prime if s^2 > n, otherwise (Brillhart-Lehmer-Selfridge) n = c2 s^2 + c1 s + 1
+    is prime iff c1^2 - 4 c2 is not a square
+    """
+    r, rem = divmod(n - 1, s)
+    if rem or s ** 3 < n:
+        raise ValueError('n = s * r + 1, n <= s^3 expected')
+    if s * s <= n and _is_square((r % s) ** 2 - 4 * (r // s)):
+        return None
+    for a in range(2, n):
+        b = pow(a, r, n)
+        if pow(b, s, n) != 1:
+            return None
+        g = gcd(b - 1, n)
+        if g == 1:
+            return a
+        if g != n:
+            return None
+
+
+def big_prime_certified(s, primes, tree=None):
+    """ Same as big_prime, but primality is proven by pocklington_witness, Returns certificate (n, s, a) """
+    tree = product_tree(primes) if tree is None else tree
+    for r in candidates(s, s, 4 * s + 3, tree):
+        n = s * r + 1
+        a = pocklington_witness(n, s)
+        if a is not None:
+            return n, s, a
+
+
+def big_prime_chain(p, count, primes, tree=None):
+    """ Returns list of count certificates (n, s, a), s of the first is p, s of the next ones is n of previous """
+    tree = product_tree(primes) if tree is None else tree
+    chain = []
+    for _ in range(count):
+        chain.append(big_prime_certified(chain[-1][0] if chain else p, primes, tree))
+    return chain
+
+
+def verify_certificate(chain):
+    """ Input chain from big_prime_chain (first s is checked by trial division), Returns True if every n is prime """
+    for i, (n, s, a) in enumerate(chain):
+        if i == 0:
+            if s < 2 or any(s % d == 0 for d in range(2, isqrt(s) + 1)):
+                return False
+        elif s != chain[i - 1][0]:
+            return False
+        r, rem = divmod(n - 1, s)
+        if rem or s ** 3 < n or not 1 < a < n:
+            return False
+        if s * s <= n and _is_square((r % s) ** 2 - 4 * (r // s)):
+            return False
+        b = pow(a, r, n)
+        if pow(b, s, n) != 1 or gcd(b - 1, n) != 1:
+            return False
+    return True
+
+
+_worker_tree = None
+
+
+def _init_worker(primes):
+    global _worker_tree
+    _worker_tree = product_tree(primes)
+
+
+def _search_chunk(s, r_lo, r_hi):
+    """ Returns (smallest r in [r_lo, r_hi) with prime s * r + 1 or None, candidates tested, seconds, worker pid) """
+    start, tested = time.perf_counter(), 0
+    for r in candidates(s, r_lo, r_hi, _worker_tree):
+        tested += 1
+        if miller_rabin(s * r + 1, 40):
+            return r, tested, time.perf_counter() - start, os.getpid()
+    return None, tested, time.perf_counter() - start, os.getpid()
+
+
+def big_prime_parallel(s, primes, workers=None, chunk_size=1 << 12, stats=None):
+    """
+    Same as big_prime, r range is split into chunks searched by a pool of processes.
+    Chunk results are taken in order of r, so the smallest r is returned regardless of which worker finishes first.
+    If stats dict is given, stats[pid] = [candidates tested, seconds] is accumulated for every worker
+    """
+    workers = workers or os.cpu_count()
+    chunks = iter(range(s, 4 * s + 3, chunk_size))
+    pending, results, next_chunk = {}, {}, s
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(primes,)) as executor:
+        try:
+            while True:
+                for r_lo in chunks:
+                    future = executor.submit(_search_chunk, s, r_lo, min(r_lo + chunk_size, 4 * s + 3))
+                    pending[future] = r_lo
+                    if len(pending) >= 2 * workers:
+                        break
+                if not pending:
+                    return None
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    r, tested, seconds, pid = future.result()
+                    results[pending.pop(future)] = r
+                    if stats is not None:
+                        worker = stats.setdefault(pid, [0, 0.0])
+                        worker[0] += tested
+                        worker[1] += seconds
+
+                while next_chunk in results:  # chunks below next_chunk are finished without prime
+                    r = results.pop(next_chunk)
+                    if r is not None:
+                        return s * r + 1
+                    next_chunk += chunk_size
+        finally:
+            for future in pending:
+                future.cancel()
 
 
 if __name__ == '__main__':
-    primes = primes_from_2_to(140_000)
+    import sys
+    from prime_bitmap import PrimeBitmap
+
+    primes = PrimeBitmap.open_or_build('primes.npy', 140_000).primes(140_000).tolist()
+
+    tree = product_tree(primes)
+
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 0  # 0 for sequential search
 
     p = int(primes[-1])
-    for _ in range(3):
-        p = big_prime(p, primes)
-        print('BIG PRIME:', p, len(str(p)))
+    if workers:
+        for _ in range(3):
+            stats = {}
+            p = big_prime_parallel(p, primes, workers, stats=stats)
+            for pid, (tested, seconds) in sorted(stats.items()):
+                print(f'  worker {pid}: {tested} candidates, {tested / max(seconds, 1e-9):.0f} candidates/s')
+            print('BIG PRIME:', p, len(str(p)))
+    else:
+        chain = big_prime_chain(p, 3, primes, tree)
+        for n, _, _ in chain:
+            print('BIG PRIME:', n, len(str(n)))
+        print('CERTIFICATE VERIFIED:', verify_certificate(chain))
@@ -0,0 +1,200 @@
+from math import gcd, isqrt, prod
+
+import numpy as np
+
+from big_primes import primes_from_2_to, pow_mod
+
+SMALL_PRIMES = primes_from_2_to(1000)
+SMALL_PRIMES_SET = frozenset(SMALL_PRIMES.tolist())
+SMALL_PRIMORIAL = prod(SMALL_PRIMES.tolist())
+SMALL_LIMIT = 1000 * 1000  # n < SMALL_LIMIT without prime factors < 1000 is prime
+
+# (limit, bases): strong probable prime test with bases is deterministic for n < limit
+DETERMINISTIC_BASES = [
+    (2_047, (2,)),
+    (1_373_653, (2, 3)),
+    (25_326_001, (2, 3, 5)),
+    (3_215_031_751, (2, 3, 5, 7)),
+    (2_152_302_898_747, (2, 3, 5, 7, 11)),
+    (3_474_749_660_383, (2, 3, 5, 7, 11, 13)),
+    (341_550_071_728_321, (2, 3, 5, 7, 11, 13, 17)),
+    (3_825_123_056_546_413_051, (2, 3, 5, 7, 11, 13, 17, 19, 23)),
+    (318_665_857_834_031_151_167_461, (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)),
+    (3_317_044_064_679_887_385_961_981, (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)),
+]
+BASES_U32 = (2, 7, 61)  # deterministic for n < 4_759_123_141
+SCREEN_CHUNK = 1 << 12  # values screened by small primes at once
+
+
+def strong_probable_prime(n, bases):
+    """ Input odd n > 2, Returns True if n is a strong probable prime to all bases """
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    for a in bases:
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1 or a % n == 0:
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def jacobi(a, n):
+    """ Input odd n > 0, Returns Jacobi symbol (a/n) """
+    a %= n
+    result = 1
+    while a:
+        while a % 2 == 0:
+            a //= 2
+            if n % 8 in (3, 5):
+                result = -result
+        a, n = n, a
+        if a % 4 == 3 and n % 4 == 3:
+            result = -result
+        a %= n
+    return result if n == 1 else 0
+
+
+def strong_lucas_probable_prime(n):
+    """ Input odd n > 2 which is not a square, Returns True if n is a strong Lucas probable prime (Selfridge parameters) """
+    d = 5
+    while jacobi(d, n) != -1:
+        if gcd(d, n) not in (1, n):
+            return False
+        d = -d - 2 if d > 0 else -d + 2
+    p, q = 1, (1 - d) // 4
+
+    def half(x):
+        x %= n
+        return (x + n if x % 2 else x) // 2
+
+    k, s = n + 1, 0
+    while k % 2 == 0:
+        k //= 2
+        s += 1
+
+    u, v, qk = 1, p, q % n  # U_1, V_1, Q^1
+    for bit in bin(k)[3:]:
+        u, v, qk = u * v % n, (v * v - 2 * qk) % n, qk * qk % n
+        if bit == '1':
+            u, v, qk = half(p * u + v), half(d * u + p * v), qk * q % n
+
+    if u == 0 or v == 0:
+        return True
+    for _ in range(s - 1):
+        v, qk = (v * v - 2 * qk) % n, qk * qk % n
+        if v == 0:
+            return True
+    return False
+
+
+def is_prime(n):
+    """ Returns True if n is prime, deterministic for n < 3.3e24, Baillie-PSW for larger n """
+    if n < 1000:
+        return n in SMALL_PRIMES_SET
+    if gcd(n, SMALL_PRIMORIAL) != 1:
+        return False
+    if n < SMALL_LIMIT:
+        return True
+    for limit, bases in DETERMINISTIC_BASES:
+        if n < limit:
+            return strong_probable_prime(n, bases)
+    return strong_probable_prime(n, (2,)) and isqrt(n) ** 2 != n and strong_lucas_probable_prime(n)
+
+
+def _strong_probable_prime_u32(n, bases):
+    """ Input uint64 array of odd n < 2^32, Returns bool array, strong probable prime test vectorized over n """
+    d, s = n - 1, np.zeros_like(n)
+    even = d & 1 == 0
+    while even.any():
+        d[even] >>= 1
+        s += even
+        even = d & 1 == 0
+
+    result = np.ones(len(n), dtype=bool)
+    for a in bases:
+        x = pow_mod(np.full_like(n, a), d, n)
+        passed = (x == 1) | (x == n - 1)
+        for r in range(1, int(s.max(initial=1))):
+            x = x * x % n
+            passed |= (x == n - 1) & (r < s)
+        result &= passed
+    return result
+
+
+def _is_prime_u64(n):
+    """ Input uint64 array, Returns bool array """
+    result = np.zeros(len(n), dtype=bool)
+    small = n < 1000
+    result[small] = np.isin(n[small], SMALL_PRIMES)
+
+    rest = np.flatnonzero(~small)
+    ps = SMALL_PRIMES.astype(np.uint64)
+    for i in range(0, len(rest), SCREEN_CHUNK):
+        idx = rest[i:i + SCREEN_CHUNK]
+        idx = idx[(n[idx, None] % ps != 0).all(axis=1)]
+
+        below = n[idx] < SMALL_LIMIT
+        result[idx[below]] = True
+        idx = idx[~below]
+
+        u32 = n[idx] < 1 << 32
+        result[idx[u32]] = _strong_probable_prime_u32(n[idx[u32]], BASES_U32)
+        result[idx[~u32]] = [is_prime(v) for v in n[idx[~u32]].tolist()]
+    return result
+
+
+def is_prime_many(values):
+    """
+    Returns bool array, is_prime for every value.
+    Values 0 <= n < 2^64 are screened by small primes and tested with NumPy (n < 2^32) in chunks, larger ones one by one
+    """
+    if isinstance(values, np.ndarray) and values.dtype.kind in 'iu':
+        result = np.zeros(len(values), dtype=bool)
+        positive = values > 0
+        result[positive] = _is_prime_u64(values[positive].astype(np.uint64))
+        return result
+
+    values = np.array(list(values), dtype=object)
+    result = np.zeros(len(values), dtype=bool)
+    fits = np.array([0 <= v < 1 << 64 for v in values], dtype=bool)
+    result[fits] = _is_prime_u64(values[fits].astype(np.uint64))
+    result[~fits] = [is_prime(int(v)) for v in values[~fits]]
+    return result
+
+
+if __name__ == '__main__':
+    import random
+    import time
+
+    from big_primes import miller_rabin
+
+    random.seed(0)
+    for bits, count in ((64, 2000), (512, 2000), (1024, 500), (2048, 200)):
+        numbers = [random.getrandbits(bits) | 1 << bits - 1 | 1 for _ in range(count)]
+        start = time.perf_counter()
+        expected = [miller_rabin(n, 40) for n in numbers]
+        mr_time = time.perf_counter() - start
+        start = time.perf_counter()
+        got = [is_prime(n) for n in numbers]
+        time_ = time.perf_counter() - start
+        assert got == expected
+        print(f'{count} x {bits} bits: miller_rabin(n, 40) {mr_time:.3f}s, is_prime {time_:.3f}s, {sum(got)} primes')
+
+    for dtype, high in ((np.uint32, 1 << 32), (np.uint64, 1 << 63)):
+        numbers = np.random.default_rng(0).integers(4, high, 100_000, dtype=np.uint64).astype(dtype)
+        start = time.perf_counter()
+        expected = [miller_rabin(n, 40) for n in numbers.tolist()]
+        mr_time = time.perf_counter() - start
+        start = time.perf_counter()
+        got = is_prime_many(numbers)
+        time_ = time.perf_counter() - start
+        assert got.tolist() == expected
+        print(f'{len(numbers)} {np.dtype(dtype).name}: miller_rabin(n, 40) {mr_time:.3f}s, '
+              f'is_prime_many {time_:.3f}s, {got.sum()} primes')
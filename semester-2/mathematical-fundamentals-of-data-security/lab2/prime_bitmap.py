@@ -0,0 +1,138 @@
+import os
+
+import numpy as np
+
+from big_primes import primes_in_range
+
+# numbers coprime to 30 are 30k + r, r in RESIDUES; byte k, bit j of the bitmap <=> 30k + RESIDUES[j] is prime
+RESIDUES = np.array([1, 7, 11, 13, 17, 19, 23, 29], dtype=np.int64)
+BIT = np.full(30, -1, dtype=np.int64)
+BIT[RESIDUES] = np.arange(8)
+# MASK_UP_TO[r] has bits of residues <= r set
+MASK_UP_TO = np.array([sum(1 << j for j in range(8) if RESIDUES[j] <= r) for r in range(30)], dtype=np.uint8)
+POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.int64)
+
+BLOCK_SIZE = 64  # bytes per popcount index entry
+BUILD_CHUNK = 1 << 20  # bytes sieved at a time while building
+
+
+class PrimeBitmap:
+    """
+    Wheel-30 prime bitmap: 8 bits per 30 integers, stored in a .npy file and memory-mapped on open.
+    Popcount index with prime count per BLOCK_SIZE bytes is stored next to it in <path>.idx.npy
+    """
+
+    def __init__(self, bitmap, index):
+        self.bitmap = bitmap
+        self.index = index  # index[b] = number of primes > 5 in bytes [0, b * BLOCK_SIZE)
+        self.limit = 30 * len(bitmap)
+
+    @staticmethod
+    def index_path(path):
+        return path + '.idx.npy'
+
+    @classmethod
+    def build(cls, path, limit):
+        """ Sieves all primes < limit (rounded up to multiple of 30) chunk by chunk into bitmap file at path """
+        n_bytes = max(-(-limit // 30), 1)
+        bitmap = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=(n_bytes,))
+        for k0 in range(0, n_bytes, BUILD_CHUNK):
+            k1 = min(k0 + BUILD_CHUNK, n_bytes)
+            primes = primes_in_range(max(30 * k0, 7), 30 * k1)
+            bits = np.zeros(8 * (k1 - k0), dtype=bool)
+            bits[8 * (primes // 30 - k0) + BIT[primes % 30]] = True
+            bitmap[k0:k1] = np.packbits(bits, bitorder='little')
+        bitmap.flush()
+
+        n_blocks = -(-n_bytes // BLOCK_SIZE)
+        index = np.zeros(n_blocks + 1, dtype=np.int64)
+        for b0 in range(0, n_blocks, BUILD_CHUNK // BLOCK_SIZE):
+            b1 = min(b0 + BUILD_CHUNK // BLOCK_SIZE, n_blocks)
+            counts = POPCOUNT[bitmap[b0 * BLOCK_SIZE:b1 * BLOCK_SIZE]]
+            counts = np.add.reduceat(counts, np.arange(0, len(counts), BLOCK_SIZE))
+            index[b0 + 1:b1 + 1] = index[b0] + np.cumsum(counts)
+        np.save(cls.index_path(path), index)
+        del bitmap
+
+        return cls.open(path)
+
+    @classmethod
+    def open(cls, path):
+        """ Memory-maps bitmap file built by build() """
+        return cls(np.load(path, mmap_mode='r'), np.load(cls.index_path(path), mmap_mode='r'))
+
+    @classmethod
+    def open_or_build(cls, path, limit):
+        """ Opens bitmap file at path if it covers numbers < limit, builds it otherwise """
+        if os.path.exists(path) and os.path.exists(cls.index_path(path)):
+            bitmap = cls.open(path)
+            if bitmap.limit >= limit:
+                return bitmap
+        return cls.build(path, limit)
+
+    def _check(self, n):
+        if not 0 <= n < self.limit:
+            raise ValueError(f'{n} is out of bitmap range [0, {self.limit})')
+
+    def is_small_prime(self, n):
+        """ Input 0 <= n < limit, Returns True if n is prime """
+        self._check(n)
+        if n < 7:
+            return n in (2, 3, 5)
+        bit = BIT[n % 30]
+        return bit >= 0 and bool(self.bitmap[n // 30] >> bit & 1)
+
+    def next_prime(self, n):
+        """ Returns smallest prime p > n, p < limit """
+        if n < 5:
+            return (2, 2, 3, 5, 5)[max(n, 0)]
+        self._check(n)
+        k = n // 30
+        byte = int(self.bitmap[k]) & ~int(MASK_UP_TO[n % 30]) & 0xff
+        while not byte:
+            k += 1
+            if k >= len(self.bitmap):
+                raise ValueError(f'No primes greater than {n} in bitmap range [0, {self.limit})')
+            nonzero = np.flatnonzero(self.bitmap[k:k + BLOCK_SIZE])
+            if len(nonzero):
+                k += int(nonzero[0])
+                byte = int(self.bitmap[k])
+            else:
+                k += BLOCK_SIZE - 1
+        return 30 * k + int(RESIDUES[(byte & -byte).bit_length() - 1])
+
+    def prime_pi(self, x):
+        """ Returns number of primes p <= x """
+        if x < 7:
+            return sum(p <= x for p in (2, 3, 5))
+        self._check(x)
+        k = x // 30
+        block = k // BLOCK_SIZE
+        count = int(self.index[block]) + int(POPCOUNT[self.bitmap[block * BLOCK_SIZE:k]].sum())
+        return 3 + count + int(POPCOUNT[self.bitmap[k] & MASK_UP_TO[x % 30]])
+
+    def nth_prime(self, n):
+        """ Returns n-th prime, n >= 1 """
+        if n < 1:
+            raise ValueError('n >= 1 expected')
+        if n <= 3:
+            return (2, 3, 5)[n - 1]
+        n -= 3
+        block = int(np.searchsorted(self.index, n, side='left')) - 1
+        if block >= len(self.index) - 1:
+            raise ValueError(f'Less than {n + 3} primes in bitmap range [0, {self.limit})')
+        start = block * BLOCK_SIZE
+        counts = np.cumsum(POPCOUNT[self.bitmap[start:start + BLOCK_SIZE]]) + int(self.index[block])
+        k = int(np.searchsorted(counts, n, side='left'))
+        byte = int(self.bitmap[start + k])
+        for _ in range(n - int(counts[k] - POPCOUNT[byte]) - 1):
+            byte &= byte - 1  # drop lowest set bit
+        return 30 * (start + k) + int(RESIDUES[(byte & -byte).bit_length() - 1])
+
+    def primes(self, n=None):
+        """ Returns a array of primes, 2 <= p < n (n defaults to limit) """
+        n = self.limit if n is None else n
+        self._check(n - 1)
+        bits = np.flatnonzero(np.unpackbits(self.bitmap[:-(-n // 30)], bitorder='little'))
+        primes = np.r_[2, 3, 5, 30 * (bits // 8) + RESIDUES[bits % 8]]
+        return primes[primes < n]
@@ -0,0 +1,36 @@
+import os
+import time
+
+from shamir import c_d, generate_key, generate_keys, send_message
+
+KEY_PRIMES = (5807, 2 ** 61 - 1, 2 ** 521 - 1, 2 ** 2203 - 1)
+KEY_COUNT = 5000
+C_D_COUNT = 200  # c_d is slow, it is timed on fewer keys
+MESSAGE_PRIMES = (5807, 4_294_967_291, 1_125_899_906_842_597, 2 ** 61 - 1, 2 ** 521 - 1)
+MESSAGE_BYTES = 1 << 16
+
+
+def per_item(fn, count, repeat=3):
+    """ Returns best time of repeat runs of fn(count) divided by count """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(count)
+        best = min(best, time.perf_counter() - start)
+    return best / count
+
+
+if __name__ == '__main__':
+    print(f'{"p bits":>7} {"c_d, us":>10} {"generate_key, us":>17} {"generate_keys, us":>18}')
+    for p in KEY_PRIMES:
+        loop = per_item(lambda n: [c_d(p) for _ in range(n)], C_D_COUNT) if p < 100_000 else None
+        single = per_item(lambda n: [generate_key(p) for _ in range(n)], KEY_COUNT)
+        batch = per_item(lambda n: generate_keys(p, n), KEY_COUNT)
+        loop = f'{loop * 1e6:10.1f}' if loop is not None else f'{"-":>10}'
+        print(f'{p.bit_length():>7} {loop} {single * 1e6:>17.2f} {batch * 1e6:>18.2f}')
+
+    message = os.urandom(MESSAGE_BYTES)
+    print(f'\n{"p bits":>7} {"send_message, MB/s":>19}')
+    for p in MESSAGE_PRIMES:
+        seconds = per_item(lambda _: send_message(message, p), 1)
+        print(f'{p.bit_length():>7} {MESSAGE_BYTES / seconds / 2 ** 20:>19.3f}')
@@ -0,0 +1,126 @@
+import csv
+import re
+from collections import namedtuple
+
+import xlsxwriter
+
+Record = namedtuple('Record', 'ch m c_a d_a c_b d_b x1 x2 x3 x4')
+
+SHEET_A_HEADERS = ('Символ', 'm', 'cA', 'dA', 'x1', 'x2', 'x3')
+SHEET_B_HEADERS = ('cB', 'dB', 'x1', 'x2', 'x3', 'x4', 'm', 'Символ')
+CSV_HEADERS = ('Символ', 'm', 'cA', 'dA', 'cB', 'dB', 'x1', 'x2', 'x3', 'x4')
+
+# lines printed by shamir.py: 'm1 = 30(u), cA = .., dA = .., cB = .., dB = ..' and 'x1 = 30 ** 7 mod 5807 = 1234'
+KEYS_PATTERN = re.compile(r'(\d+)\((\w| )\), cA = (\d+), dA = (\d+), cB = (\d+), dB = (\d+)')
+PASS_PATTERN = re.compile(r'x([1-4]) = \d+ \*\* \d+ mod \d+ = (\d+)')
+
+
+def sheet_a_row(record):
+    return record.ch, record.m, record.c_a, record.d_a, record.x1, record.x2, record.x3
+
+
+def sheet_b_row(record):
+    return record.c_b, record.d_b, record.x1, record.x2, record.x3, record.x4, record.m, record.ch
+
+
+def parse_out(path, p=None):
+    """
+    Yields Records from protocol output file, reading it line by line.
+    Passes are taken from 'x1 = ...' lines, if p is given, passes without such lines are computed
+    """
+    keys, passes = None, {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            match = KEYS_PATTERN.search(line)
+            if match:
+                if keys is not None:
+                    yield _record(keys, passes, p)
+                m, ch, c_a, d_a, c_b, d_b = match.groups()
+                keys, passes = (ch, int(m), int(c_a), int(d_a), int(c_b), int(d_b)), {}
+                continue
+            match = PASS_PATTERN.search(line)
+            if match and keys is not None:
+                passes[int(match.group(1))] = int(match.group(2))
+    if keys is not None:
+        yield _record(keys, passes, p)
+
+
+def _record(keys, passes, p):
+    ch, m, c_a, d_a, c_b, d_b = keys
+    if len(passes) < 4:
+        if p is None:
+            raise ValueError(f'Passes of m = {m}({ch}) are missing, p is needed to compute them')
+        x = m
+        for i, e in enumerate((c_a, c_b, d_a, d_b), start=1):
+            x = passes.get(i, pow(x, e, p))
+            passes[i] = x
+    return Record(ch, m, c_a, d_a, c_b, d_b, passes[1], passes[2], passes[3], passes[4])
+
+
+class XlsxReport:
+    """ Streams records to sheets A and B of a workbook in constant_memory mode, row by row """
+
+    def __init__(self, path):
+        self.workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+        self.cell_format = self.workbook.add_format({'align': 'center', 'valign': 'vcenter'})
+        header_format = self.workbook.add_format({'align': 'center', 'valign': 'vcenter', 'bold': True})
+        self.sheets = []
+        for name, headers in (('A', SHEET_A_HEADERS), ('B', SHEET_B_HEADERS)):
+            worksheet = self.workbook.add_worksheet(name)
+            worksheet.freeze_panes(1, 0)
+            worksheet.write_row(0, 0, headers, header_format)
+            self.sheets.append((worksheet, len(headers)))
+        self.rows = 0
+
+    def write(self, record):
+        self.rows += 1
+        (sheet_a, _), (sheet_b, _) = self.sheets
+        sheet_a.write_row(self.rows, 0, sheet_a_row(record), self.cell_format)
+        sheet_b.write_row(self.rows, 0, sheet_b_row(record), self.cell_format)
+
+    def close(self):
+        for worksheet, columns in self.sheets:  # tables are not supported in constant_memory mode
+            worksheet.autofilter(0, 0, self.rows, columns - 1)
+        self.workbook.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CsvReport:
+    """ Streams records to a CSV file, one row per record """
+
+    def __init__(self, path):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(CSV_HEADERS)
+        self.rows = 0
+
+    def write(self, record):
+        self.rows += 1
+        self.writer.writerow(record)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_report(path):
+    """ Returns CsvReport for .csv path, XlsxReport otherwise """
+    return CsvReport(path) if path.lower().endswith('.csv') else XlsxReport(path)
+
+
+def write_report(records, path):
+    """ Streams records to report at path, Returns number of records written """
+    with open_report(path) as report:
+        for record in records:
+            report.write(record)
+    return report.rows
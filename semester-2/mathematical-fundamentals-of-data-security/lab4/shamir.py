@@ -1,6 +1,9 @@
-from random import randint
+from math import gcd
+from random import randint, randrange
 
-import xlsxwriter
+import numpy as np
+
+VECTOR_P_LIMIT = 1 << 50  # blocks are processed with NumPy below it
 
 
 def c_d(p):
@@ -11,59 +14,147 @@ def c_d(p):
                 return c, d
 
 
+def generate_key(p):
+    """ Input prime p > 3, Returns (c, d), c * d = 1 (mod p - 1) """
+    while True:
+        c = randrange(2, p - 1)
+        if gcd(c, p - 1) == 1:
+            return c, pow(c, -1, p - 1)
+
+
+def inverse_many(c, m):
+    """ Input int64 array c, gcd(c, m) = 1, m < 2^62, Returns array of c^-1 mod m, extended Euclid vectorized over c """
+    r0, r1 = np.full_like(c, m), c % m
+    t0, t1 = np.zeros_like(c), np.ones_like(c)
+    result = np.empty_like(c)
+    index = np.arange(len(c))
+    while len(index):
+        done = r1 == 1
+        result[index[done]] = t1[done] % m
+        index, r0, r1, t0, t1 = (x[~done] for x in (index, r0, r1, t0, t1))
+        q = r0 // r1
+        r0, r1 = r1, r0 - q * r1
+        t0, t1 = t1, t0 - q * t1
+    return result
+
+
+def generate_keys(p, count):
+    """ Input prime p > 3, Returns list of count keys (c, d), keys are computed with NumPy if p - 1 < 2^62 """
+    m = p - 1
+    if m >= 1 << 62:
+        return [generate_key(p) for _ in range(count)]
+
+    rng = np.random.default_rng()
+    keys = []
+    while len(keys) < count:
+        c = rng.integers(2, m, 2 * (count - len(keys)))
+        c = c[np.gcd(c, m) == 1][:count - len(keys)]
+        keys += zip(c.tolist(), inverse_many(c, m).tolist())
+    return keys
+
+
+def block_bytes(p):
+    """ Returns number of message bytes packed into one block, 256^k < p """
+    return (p.bit_length() - 1) // 8
+
+
+def pack(message, p):
+    """
+    Input str or bytes, Returns blocks < p of message utf-8 bytes,
+    uint64 array if p < VECTOR_P_LIMIT, list of ints otherwise
+    """
+    data = message.encode() if isinstance(message, str) else bytes(message)
+    k = block_bytes(p)
+    if not k:
+        raise ValueError('p > 256 expected')
+    data += bytes(-len(data) % k)
+    if p < VECTOR_P_LIMIT:
+        digits = np.frombuffer(data, dtype=np.uint8).reshape(-1, k).astype(np.uint64)
+        return digits @ (np.uint64(256) ** np.arange(k - 1, -1, -1, dtype=np.uint64))
+    return [int.from_bytes(data[i:i + k], 'big') for i in range(0, len(data), k)]
+
+
+def unpack(blocks, p, length):
+    """ Reverses pack, Returns first length bytes """
+    k = block_bytes(p)
+    if isinstance(blocks, np.ndarray):
+        shifts = 8 * np.arange(k - 1, -1, -1, dtype=np.uint64)
+        data = (blocks[:, None] >> shifts & 0xff).astype(np.uint8).tobytes()
+    else:
+        data = b''.join(b.to_bytes(k, 'big') for b in blocks)
+    return data[:length]
+
+
+def mul_mod(a, b, p):
+    """ Input uint64 arrays a, b < p < VECTOR_P_LIMIT, Returns array of a * b mod p """
+    if p < 1 << 32:
+        return a * b % p
+    # quotient from float64 is off by at most 1, remainder is exact in wrapping uint64 arithmetic
+    q = (a.astype(np.float64) * b.astype(np.float64) / p).astype(np.uint64)
+    r = (a * b - q * np.uint64(p)).view(np.int64)
+    r[r < 0] += p
+    r[r >= p] -= p
+    return r.view(np.uint64)
+
+
+def pow_many(x, e, p):
+    """ Input uint64 array x, p < VECTOR_P_LIMIT, Returns array of x^e mod p """
+    result = np.ones_like(x)
+    x = x % np.uint64(p)
+    while e:
+        if e & 1:
+            result = mul_mod(result, x, p)
+        x = mul_mod(x, x, p)
+        e >>= 1
+    return result
+
+
+def shamir_pass(blocks, e, p):
+    """ Returns blocks raised to e mod p, one pass of the protocol """
+    if isinstance(blocks, np.ndarray):
+        return pow_many(blocks, e, p)
+    return [pow(x, e, p) for x in blocks]
+
+
+def three_pass(blocks, p, key_a, key_b):
+    """ Runs protocol passes over all blocks with one key pair of each side, Returns (x1, x2, x3, x4), x4 = blocks """
+    (c_a, d_a), (c_b, d_b) = key_a, key_b
+    x1 = shamir_pass(blocks, c_a, p)
+    x2 = shamir_pass(x1, c_b, p)
+    x3 = shamir_pass(x2, d_a, p)
+    x4 = shamir_pass(x3, d_b, p)
+    return x1, x2, x3, x4
+
+
+def send_message(message, p, key_a=None, key_b=None):
+    """
+    Sends message packed into blocks through three-pass protocol in one session, missing keys are generated.
+    Returns (received bytes, (x1, x2, x3, x4))
+    """
+    data = message.encode() if isinstance(message, str) else bytes(message)
+    passes = three_pass(pack(data, p), p, key_a or generate_key(p), key_b or generate_key(p))
+    return unpack(passes[-1], p, len(data)), passes
+
+
 if __name__ == '__main__':
+    from report import Record, open_report  # xlsxwriter is needed only to write the report
+
     p = 5807
     message = 'unfortunately you did not answer my question and did not take into account my remark'
 
-    workbook = xlsxwriter.Workbook('shamir_.xlsx')
-    cell_format = workbook.add_format()
-    cell_format.set_align('center')
-    cell_format.set_align('vcenter')
-
-    worksheet1 = workbook.add_worksheet('A')
-    worksheet1.add_table(f'A1:G{len(message) + 1}', {
-        'columns': [
-            {'header': 'Символ'},
-            {'header': 'm'},
-            {'header': 'cA'},
-            {'header': 'dA'},
-            {'header': 'x1'},
-            {'header': 'x2'},
-            {'header': 'x3'}
-        ],
-    })
-    worksheet2 = workbook.add_worksheet('B')
-    worksheet2.add_table(f'A1:H{len(message) + 1}', {
-        'columns': [
-            {'header': 'cB'},
-            {'header': 'dB'},
-            {'header': 'x1'},
-            {'header': 'x2'},
-            {'header': 'x3'},
-            {'header': 'x4'},
-            {'header': 'm'},
-            {'header': 'Символ'}
-        ]
-    })
-
-    for i, ch in enumerate(message, start=1):
-        m = ord(ch) - 87 if ch != ' ' else 36
-        cA, dA = c_d(p)
-        cB, dB = c_d(p)
-        x1 = pow(m, cA, p)
-        x2 = pow(x1, cB, p)
-        x3 = pow(x2, dA, p)
-        x4 = pow(x3, dB, p)
-        print(f'm{i} = {m}({ch}), cA = {cA}, dA = {dA}, cB = {cB}, dB = {dB}')
-        print(f'x1 = {m} ** {cA} mod {p} = {x1}')
-        print(f'x2 = {x1} ** {cB} mod {p} = {x2}')
-        print(f'x3 = {x2} ** {dA} mod {p} = {x3}')
-        print(f'x4 = {x3} ** {dB} mod {p} = {x4}', end='\n\n')
-
-        for col, value in enumerate((ch, m, cA, dA, x1, x2, x3)):
-            worksheet1.write(i, col, value, cell_format)
-
-        for col, value in enumerate((cB, dB, x1, x2, x3, x4, m, ch)):
-            worksheet2.write(i, col, value, cell_format)
-
-    workbook.close()
+    with open_report('shamir_.xlsx') as report:
+        for i, ch in enumerate(message, start=1):
+            m = ord(ch) - 87 if ch != ' ' else 36
+            cA, dA = generate_key(p)
+            cB, dB = generate_key(p)
+            x1 = pow(m, cA, p)
+            x2 = pow(x1, cB, p)
+            x3 = pow(x2, dA, p)
+            x4 = pow(x3, dB, p)
+            print(f'm{i} = {m}({ch}), cA = {cA}, dA = {dA}, cB = {cB}, dB = {dB}')
+            print(f'x1 = {m} ** {cA} mod {p} = {x1}')
+            print(f'x2 = {x1} ** {cB} mod {p} = {x2}')
+            print(f'x3 = {x2} ** {dA} mod {p} = {x3}')
+            print(f'x4 = {x3} ** {dB} mod {p} = {x4}', end='\n\n')
+
+            report.write(Record(ch, m, cA, dA, cB, dB, x1, x2, x3, x4))
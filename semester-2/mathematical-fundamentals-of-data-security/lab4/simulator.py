@@ -0,0 +1,101 @@
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from shamir import generate_key, pack, shamir_pass
+
+PERCENTILES = (50, 90, 99)
+
+
+def _init_worker():
+    random.seed()  # forked workers would otherwise generate the same keys
+
+
+def _simulate_chunk(p, seed, count, message_bytes):
+    """
+    Runs protocol for count random messages, Returns (key generation seconds, seconds of every pass, blocks checked,
+    blocks with x4 != m)
+    """
+    rng = random.Random(seed)
+    keygen, passes = [], ([], [], [], [])
+    checked = failed = 0
+    for _ in range(count):
+        message = rng.randbytes(message_bytes)
+        start = time.perf_counter()
+        key_a, key_b = generate_key(p), generate_key(p)
+        keygen.append(time.perf_counter() - start)
+
+        blocks = x = pack(message, p)
+        for seconds, e in zip(passes, (key_a[0], key_b[0], key_a[1], key_b[1])):
+            start = time.perf_counter()
+            x = shamir_pass(x, e, p)
+            seconds.append(time.perf_counter() - start)
+
+        checked += len(blocks)
+        failed += int(np.count_nonzero(np.asarray(x) != np.asarray(blocks)))
+    return keygen, passes, checked, failed
+
+
+def simulate(p, messages, message_bytes, workers=None, chunk_size=64, seed=0):
+    """
+    Runs three-pass protocol for messages random messages of message_bytes bytes, chunks of chunk_size messages are
+    spread over workers processes (workers=1 to stay in this process), Returns dict of metrics
+    """
+    if messages < 1 or chunk_size < 1:
+        raise ValueError(f'messages and chunk_size must be positive, got {messages} and {chunk_size}')
+    chunks = [(p, seed + i, min(chunk_size, messages - start), message_bytes)
+              for i, start in enumerate(range(0, messages, chunk_size))]
+    start = time.perf_counter()
+    if workers == 1:
+        results = [_simulate_chunk(*chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init_worker) as executor:
+            results = list(executor.map(_simulate_chunk, *zip(*chunks)))
+    wall = time.perf_counter() - start
+
+    keygen = np.array([s for r in results for s in r[0]])
+    passes = [np.array([s for r in results for s in r[1][i]]) for i in range(4)]
+    return {
+        'p_bits': p.bit_length(),
+        'messages': messages,
+        'message_bytes': message_bytes,
+        'workers': workers or os.cpu_count(),
+        'seconds': wall,
+        'messages_per_second': messages / wall,
+        'megabytes_per_second': messages * message_bytes / wall / 2 ** 20,
+        'blocks_checked': sum(r[2] for r in results),
+        'blocks_failed': sum(r[3] for r in results),
+        'keygen_seconds': {'mean': keygen.mean(), **dict(zip(map(str, PERCENTILES), np.percentile(keygen, PERCENTILES)))},
+        'pass_seconds': [{'mean': s.mean(), **dict(zip(map(str, PERCENTILES), np.percentile(s, PERCENTILES)))}
+                         for s in passes],
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='Load test Shamir three-pass protocol')
+    parser.add_argument('--p', type=int, default=5807, help='prime modulus')
+    parser.add_argument('--messages', type=int, default=1000)
+    parser.add_argument('--size', type=int, default=1024, help='message size in bytes')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes, 1 to run in this process')
+    parser.add_argument('--chunk-size', type=int, default=64, help='messages per task')
+    parser.add_argument('--json', help='file to write metrics to')
+    arguments = parser.parse_args()
+
+    metrics = simulate(arguments.p, arguments.messages, arguments.size, arguments.workers, arguments.chunk_size)
+    print(f'p: {metrics["p_bits"]} bits, {metrics["messages"]} messages of {metrics["message_bytes"]} bytes, '
+          f'{metrics["workers"]} workers')
+    print(f'{metrics["messages_per_second"]:.1f} messages/s, {metrics["megabytes_per_second"]:.3f} MB/s, '
+          f'{metrics["blocks_failed"]} of {metrics["blocks_checked"]} blocks failed')
+    for name, stats in [('keygen', metrics['keygen_seconds'])] + \
+                       [(f'pass {i}', s) for i, s in enumerate(metrics['pass_seconds'], start=1)]:
+        print(f'{name:>7}: mean {stats["mean"] * 1e6:10.1f} us, ' +
+              ', '.join(f'p{q} {stats[str(q)] * 1e6:10.1f} us' for q in PERCENTILES))
+    if arguments.json:
+        with open(arguments.json, 'w') as f:
+            json.dump(metrics, f, indent=2)